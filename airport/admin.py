@@ -10,8 +10,10 @@ from airport.models import (
     Route,
     Airplane,
     Flight,
+    FlightSchedule,
     Ticket,
 )
+from airport.schedules import expand_schedules, retract_schedule
 
 
 admin.site.register(Country)
@@ -19,8 +21,37 @@ admin.site.register(City)
 admin.site.register(Airport)
 admin.site.register(Crew)
 admin.site.register(AirplaneType)
-admin.site.register(Order)
 admin.site.register(Route)
 admin.site.register(Airplane)
 admin.site.register(Flight)
 admin.site.register(Ticket)
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    def delete_model(self, request, obj):
+        obj.cancel()
+
+    def delete_queryset(self, request, queryset):
+        for order in queryset:
+            order.cancel()
+
+
+@admin.register(FlightSchedule)
+class FlightScheduleAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "airplane", "valid_from", "valid_until")
+    readonly_fields = ("expanded_until",)
+    actions = ("expand",)
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            # Days already expanded are expanded again with the new rules,
+            # after the unbooked flights of the old rules are deleted.
+            retract_schedule(FlightSchedule.objects.get(pk=obj.pk))
+            obj.expanded_until = None
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description="Create flights for the coming days")
+    def expand(self, request, queryset):
+        created = expand_schedules(queryset)
+        self.message_user(request, f"Created {created} flight(s).")
@@ -0,0 +1,199 @@
+import json
+from collections import Counter, defaultdict
+
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+JSON_WHITESPACE = " \t\n\r"
+NUMBER_CHARS = "0123456789.eE+-"
+
+
+def iter_json_array(stream, chunk_size=1 << 16):
+    """Yields the items of a top level JSON array read in chunks.
+
+    Only the item being decoded and the rest of the current chunk are kept
+    in memory, however long the array is.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    expected = "["
+
+    def read_more():
+        nonlocal buffer, position, eof
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+        return not eof
+
+    while True:
+        while position < len(buffer) and buffer[position] in JSON_WHITESPACE:
+            position += 1
+        if position == len(buffer):
+            if not read_more():
+                raise ValueError("Unexpected end of the JSON array")
+            continue
+
+        char = buffer[position]
+        if expected == "[":
+            if char != "[":
+                raise ValueError("Expected a JSON array")
+            position += 1
+            expected = "item or ]"
+        elif char == "]" and expected != "item":
+            return
+        elif expected == ",":
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']', got {char!r}")
+            position += 1
+            expected = "item"
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof or not read_more():
+                    raise
+                continue
+            if not eof and (
+                end == len(buffer)
+                or isinstance(item, (int, float))
+                and buffer[end] in NUMBER_CHARS
+            ):
+                # A number cut by the chunk end decodes, but too early.
+                read_more()
+                continue
+            yield item
+            position = end
+            expected = ","
+
+
+class BulkLoader:
+    """Writes serialized objects with bulk queries instead of save().
+
+    Objects are buffered per model and written ``batch_size`` at a time,
+    after the buffered objects of the models they point to. Objects whose
+    primary key already exists are updated, the rest are inserted, and the
+    many-to-many rows of every object are replaced.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, batch_size=2000):
+        self.using = using
+        self.batch_size = batch_size
+        self.buffers = defaultdict(list)
+        self.models = set()
+        self.counts = Counter()
+
+    def add(self, data):
+        """Buffers one object in the python serialization format"""
+        for deserialized in serializers.deserialize(
+            "python", [data], using=self.using
+        ):
+            model = type(deserialized.object)
+            self.buffers[model].append(deserialized)
+            if len(self.buffers[model]) >= self.batch_size:
+                self.flush(model)
+
+    @staticmethod
+    def dependencies(model):
+        return {
+            field.remote_field.model
+            for field in (
+                *model._meta.concrete_fields, *model._meta.many_to_many
+            )
+            if field.is_relation and field.remote_field.model is not model
+        }
+
+    def flush(self, model, visiting=frozenset()):
+        visiting = visiting | {model}
+        for dependency in self.dependencies(model):
+            if self.buffers.get(dependency) and dependency not in visiting:
+                self.flush(dependency, visiting)
+
+        batch = self.buffers.pop(model, [])
+        if batch:
+            self.write(model, batch)
+
+    def finish(self):
+        """Writes every buffered object and returns counts per model"""
+        while self.buffers:
+            self.flush(next(iter(self.buffers)))
+        self.reset_sequences()
+        return self.counts
+
+    def write(self, model, batch):
+        manager = model._base_manager.db_manager(self.using)
+        # The last copy of an object in the batch wins, as with save().
+        by_pk = {}
+        for deserialized in batch:
+            pk = deserialized.object.pk
+            by_pk[id(deserialized) if pk is None else pk] = deserialized
+        batch = list(by_pk.values())
+
+        existing = set(
+            manager.filter(
+                pk__in=[
+                    item.object.pk for item in batch
+                    if item.object.pk is not None
+                ]
+            ).values_list("pk", flat=True)
+        )
+        new = [item.object for item in batch if item.object.pk not in existing]
+        old = [item.object for item in batch if item.object.pk in existing]
+
+        manager.bulk_create(new, batch_size=self.batch_size)
+        if old:
+            fields = [
+                field for field in model._meta.concrete_fields
+                if not field.primary_key
+            ]
+            for obj in old:
+                for field in fields:
+                    setattr(obj, field.attname, field.pre_save(obj, False))
+            manager.bulk_update(
+                old, [field.name for field in fields],
+                batch_size=self.batch_size,
+            )
+
+        self.write_m2m(model, batch, existing)
+        self.models.add(model)
+        self.counts[model._meta.label] += len(batch)
+
+    def write_m2m(self, model, batch, existing):
+        values_by_field = defaultdict(list)
+        for deserialized in batch:
+            for name, values in deserialized.m2m_data.items():
+                values_by_field[name].append((deserialized.object.pk, values))
+
+        for name, values in values_by_field.items():
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = through._meta.get_field(field.m2m_field_name()).attname
+            target = through._meta.get_field(
+                field.m2m_reverse_field_name()
+            ).attname
+            manager = through._base_manager.db_manager(self.using)
+            self.models.add(through)
+
+            if existing:
+                manager.filter(**{f"{source}__in": existing}).delete()
+            manager.bulk_create(
+                (
+                    through(**{source: pk, target: value})
+                    for pk, related in values
+                    for value in dict.fromkeys(related)
+                ),
+                batch_size=self.batch_size,
+            )
+
+    def reset_sequences(self):
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), self.models
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
@@ -0,0 +1,180 @@
+import hashlib
+import time
+from contextlib import nullcontext
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from airport.db_router import changed_recently, primary_reads
+
+
+VERSION_KEY = "airport:version:{}"
+MODIFIED_KEY = "airport:modified:{}"
+RESPONSE_KEY = "airport:response:{}"
+
+
+def model_version_key(model):
+    return VERSION_KEY.format(model._meta.label_lower)
+
+
+def model_modified_key(model):
+    return MODIFIED_KEY.format(model._meta.label_lower)
+
+
+def latest_update(model):
+    """Newest ``updated_at`` of the model rows as a timestamp"""
+    updated_at = model.objects.aggregate(latest=Max("updated_at"))["latest"]
+    return updated_at.timestamp() if updated_at else time.time()
+
+
+def get_model_state(models):
+    """Returns change versions and modification times in one round trip"""
+    version_keys = [model_version_key(model) for model in models]
+    modified_keys = [model_modified_key(model) for model in models]
+    values = cache.get_many(version_keys + modified_keys)
+
+    for model, version_key, modified_key in zip(
+        models, version_keys, modified_keys
+    ):
+        if version_key not in values:
+            # A fresh, time based start value keeps responses cached before
+            # an eviction of the counter from ever matching again.
+            cache.add(version_key, time.time_ns(), timeout=None)
+            values[version_key] = cache.get(version_key)
+        if modified_key not in values:
+            cache.add(modified_key, latest_update(model), timeout=None)
+            values[modified_key] = cache.get(modified_key)
+
+    return (
+        [values[key] for key in version_keys],
+        [values[key] for key in modified_keys],
+    )
+
+
+def get_model_versions(models):
+    """Returns the current change version of every model in one round trip"""
+    return get_model_state(models)[0]
+
+
+def get_version(key):
+    """Current value of a shared change counter, started if missing"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def increment_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_model_version(model, using=None):
+    """Invalidates every cached response that depends on the model.
+
+    Runs once the current transaction commits. Bumped before that, a
+    concurrent request would cache the rows still committed under the new
+    version, where they would stay until the next change.
+    """
+
+    def bump():
+        cache.set(model_modified_key(model), time.time(), timeout=None)
+        increment_version(model_version_key(model))
+
+    transaction.on_commit(bump, using=using)
+
+
+class CachedResponseMixin:
+    """Caches response data of read-mostly viewsets.
+
+    Entries are keyed by endpoint, normalized query parameters and the
+    change versions of ``cache_models``, so bumping a model version makes
+    every dependent entry unreachable at once. The same key is sent as the
+    ETag and the latest model change as Last-Modified, so conditional
+    requests are answered with 304 before any query runs. Both move only
+    once a change commits, so neither is sent for data a concurrent
+    request can not read yet. Set ``cache_data`` to False to keep only
+    the conditional responses.
+    """
+
+    cache_models = ()
+    cache_data = True
+    cache_timeout = 60 * 60 * 24
+
+    def get_response_signature(self, request, versions=None):
+        """Identifies the response of this endpoint for the current data"""
+        if versions is None:
+            versions = get_model_versions(self.cache_models)
+
+        query = sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+        )
+        parts = [
+            request.build_absolute_uri("/"),
+            self.basename,
+            self.action,
+            sorted(self.kwargs.items()),
+            query,
+            versions,
+        ]
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        # Clients may keep the response but must revalidate it first.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        versions, modified = get_model_state(self.cache_models)
+        signature = self.get_response_signature(request, versions)
+        etag = f'"{signature}"'
+        latest_change = max(modified, default=time.time())
+        last_modified = int(latest_change)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return self.set_validators(response, etag, last_modified)
+
+        key = RESPONSE_KEY.format(signature)
+        data = cache.get(key) if self.cache_data else None
+        if data is not None:
+            return self.set_validators(Response(data), etag, last_modified)
+
+        # The response is stored and validated as that of the current
+        # versions, which replicas may not have caught up with yet.
+        with (
+            primary_reads() if changed_recently(latest_change)
+            else nullcontext()
+        ):
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            if self.cache_data:
+                cache.set(key, response.data, timeout=self.cache_timeout)
+            self.set_validators(response, etag, last_modified)
+
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,114 @@
+"""Routes the reads of safe API requests to database replicas.
+
+Replica aliases are listed in ``settings.DATABASE_REPLICAS``. Reads go to
+one of them only inside ``replica_reads()``, which the airport viewsets
+enter for safe requests. Writes, transactions and everything else use
+the primary. A user who has just written reads from the primary for
+``REPLICA_LAG_SECONDS``, so their own changes are never missing.
+"""
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+
+PRIMARY_KEY = "airport:primary:{}"
+
+_read_database = ContextVar("read_database", default=None)
+
+
+def pin_to_primary(user):
+    cache.set(
+        PRIMARY_KEY.format(user.pk),
+        True,
+        timeout=settings.REPLICA_LAG_SECONDS,
+    )
+
+
+def is_pinned_to_primary(user):
+    return user.is_authenticated and cache.get(
+        PRIMARY_KEY.format(user.pk), False
+    )
+
+
+def changed_recently(timestamp):
+    """Whether replicas may still lag behind a change at timestamp"""
+    return time.time() - timestamp < settings.REPLICA_LAG_SECONDS
+
+
+@contextmanager
+def replica_reads(user):
+    """Reads from one replica unless the user has just written"""
+    database = None
+    if settings.DATABASE_REPLICAS and not is_pinned_to_primary(user):
+        database = random.choice(settings.DATABASE_REPLICAS)
+
+    token = _read_database.set(database)
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    token = _read_database.set(None)
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        database = _read_database.get()
+        if database and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return database
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+class ReplicaReadMixin:
+    """Sends the reads of safe requests of a viewset to the replicas"""
+
+    def dispatch(self, request, *args, **kwargs):
+        with ExitStack() as self.read_routing:
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        # Requests are routed once authentication has told the user.
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self.read_routing.enter_context(replica_reads(request.user))
+
+
+class PrimaryAfterWriteMiddleware(MiddlewareMixin):
+    """Pins the reads of a user who has just written to the primary"""
+
+    def process_response(self, request, response):
+        user = getattr(request, "user", None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user)
+        return response
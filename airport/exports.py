@@ -0,0 +1,85 @@
+import csv
+import json
+from datetime import datetime, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from airport.models import Ticket
+
+
+# (column, lookup) pairs of the export, one row per ticket.
+TICKET_EXPORT_COLUMNS = (
+    ("order_id", "order_id"),
+    ("order_created_at", "order__created_at"),
+    ("user_email", "order__user__email"),
+    ("ticket_id", "id"),
+    ("row", "row"),
+    ("seat", "seat"),
+    ("flight_id", "flight_id"),
+    ("departure_time", "flight__departure_time"),
+    ("arrival_time", "flight__arrival_time"),
+    ("route_id", "flight__route_id"),
+    ("source", "flight__route__source__name"),
+    ("destination", "flight__route__destination__name"),
+    ("distance", "flight__route__distance"),
+    ("airplane", "flight__airplane__name"),
+    ("airplane_type", "flight__airplane__airplane_type__name"),
+)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def ticket_export_rows(created_from=None, created_to=None, chunk_size=2000):
+    """Yields a tuple per ticket of orders created within the dates.
+
+    Rows are read through a server-side cursor ``chunk_size`` at a time,
+    so memory use does not grow with the number of tickets.
+    """
+    queryset = Ticket.objects.order_by("order_id", "id")
+    if created_from:
+        queryset = queryset.filter(
+            order__created_at__gte=_day_start(created_from)
+        )
+    if created_to:
+        queryset = queryset.filter(
+            order__created_at__lt=_day_start(created_to) + timedelta(days=1)
+        )
+
+    yield from queryset.values_list(
+        *(lookup for _, lookup in TICKET_EXPORT_COLUMNS)
+    ).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column for column, _ in TICKET_EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(
+            [
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in row
+            ]
+        )
+
+
+def ndjson_lines(rows):
+    columns = [column for column, _ in TICKET_EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+# Export format: (line generator, content type, file extension)
+EXPORT_FORMATS = {
+    "csv": (csv_lines, "text/csv", "csv"),
+    "ndjson": (ndjson_lines, "application/x-ndjson", "ndjson"),
+}
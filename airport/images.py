@@ -0,0 +1,116 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from airport.cache import bump_model_version
+
+
+# Variant name: (longest side in pixels, Pillow format, file extension)
+IMAGE_VARIANTS = {
+    "small.webp": (320, "WEBP", "webp"),
+    "small.jpeg": (320, "JPEG", "jpg"),
+    "medium.webp": (1024, "WEBP", "webp"),
+    "medium.jpeg": (1024, "JPEG", "jpg"),
+}
+LIST_VARIANT = "small.webp"
+
+logger = logging.getLogger(__name__)
+_executor = None
+
+
+def variant_name(name, variant):
+    """Storage name of a variant, next to the original image"""
+    _, _, extension = IMAGE_VARIANTS[variant]
+    stem, _ = os.path.splitext(name)
+    return f"{stem}.{variant.split('.')[0]}.{extension}"
+
+
+def render_variant(image, variant):
+    size, image_format, _ = IMAGE_VARIANTS[variant]
+    resized = image.copy()
+    resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+    if image_format == "JPEG" and resized.mode not in ("RGB", "L"):
+        resized = resized.convert("RGB")
+
+    output = BytesIO()
+    resized.save(output, image_format, quality=80)
+    return output.getvalue()
+
+
+def generate_variants(model, pk, name):
+    """Writes every variant of an image and records them on the object.
+
+    Nothing is recorded if the object got another image meanwhile, so a
+    late task never overwrites the variants of a newer upload.
+    """
+    storage = model._meta.get_field("image").storage
+    with storage.open(name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+
+    variants = {"source": name}
+    for variant in IMAGE_VARIANTS:
+        variants[variant] = storage.save(
+            variant_name(name, variant),
+            ContentFile(render_variant(image, variant)),
+        )
+
+    if model.objects.filter(pk=pk, image=name).update(
+        image_variants=variants
+    ):
+        bump_model_version(model)
+    return variants
+
+
+def _run(model, pk, name):
+    try:
+        generate_variants(model, pk, name)
+    except Exception:
+        # Futures of the pool are never read, so this is the only trace.
+        logger.exception(
+            "Image variants of %s %s (%s) failed", model._meta.label, pk, name
+        )
+    finally:
+        # Pool threads must not keep connections past the task.
+        connections.close_all()
+
+
+def schedule_variants(instance):
+    """Generates image variants in the worker pool once committed"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix="image-variants",
+        )
+
+    model, pk, name = type(instance), instance.pk, instance.image.name
+    transaction.on_commit(lambda: _executor.submit(_run, model, pk, name))
+
+
+def missing_variants(model):
+    """Objects of model whose current image has no variants recorded"""
+    objects = model.objects.exclude(image="").exclude(image__isnull=True)
+    return [
+        obj
+        for obj in objects.only("image", "image_variants").iterator()
+        if obj.image_variants.get("source") != obj.image.name
+    ]
+
+
+def image_url(instance, variant=None, request=None):
+    """URL of a variant of the instance image, the original until ready"""
+    if not instance.image:
+        return None
+
+    name = instance.image.name
+    if variant and instance.image_variants.get("source") == name:
+        name = instance.image_variants.get(variant, name)
+    url = instance.image.storage.url(name)
+    return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,197 @@
+import csv
+import json
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from airport.models import Airplane, Crew, Flight, Route
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+class UnreadableRow(ValueError):
+    pass
+
+
+def read_csv(lines):
+    """Yields schedule rows of a CSV file, crews separated by semicolons"""
+    for row in csv.DictReader(lines):
+        crews = row.get("crews") or ""
+        row["crews"] = [name for name in crews.split(";") if name.strip()]
+        yield row
+
+
+def read_ndjson(lines):
+    """Yields schedule rows of a file with one JSON object per line"""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise UnreadableRow(f"line {number}: {error}")
+        if not isinstance(row, dict):
+            raise UnreadableRow(f"line {number}: not a JSON object")
+        yield row
+
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson}
+
+
+def read_schedule(path, file_format=None):
+    """Streams rows of the schedule at path, guessing the format by suffix"""
+    if file_format is None:
+        file_format = "csv" if str(path).endswith(".csv") else "ndjson"
+
+    with open(path, newline="", encoding="utf-8") as file:
+        yield from READERS[file_format](file)
+
+
+def _crew_key(name):
+    return " ".join(name.split()).lower()
+
+
+class ScheduleImporter:
+    """Writes schedule rows as flights with their crews in batches.
+
+    Every row names its route by source and destination airport, the
+    airplane and the crew members by name. Those natural keys are resolved
+    through dictionaries loaded once, so a batch costs the same few queries
+    however many rows it has. Rows matching an existing flight are skipped,
+    which makes batches safe to import again.
+    """
+
+    def __init__(self):
+        self.routes = {
+            (source, destination): route_id
+            for route_id, source, destination in Route.objects.values_list(
+                "id", "source__name", "destination__name"
+            ).iterator()
+        }
+        self.airplanes = dict(
+            Airplane.objects.values_list("name", "id").iterator()
+        )
+        self.crews = {}
+        for crew_id, first_name, last_name in Crew.objects.values_list(
+            "id", "first_name", "last_name"
+        ).iterator():
+            key = _crew_key(f"{first_name} {last_name}")
+            # Namesakes can not be told apart by name.
+            self.crews[key] = None if key in self.crews else crew_id
+
+    @staticmethod
+    def _parse_time(row, field):
+        value = row.get(field)
+        moment = parse_datetime(value) if isinstance(value, str) else None
+        if moment is None:
+            raise InvalidRow(f"{field} must be an ISO 8601 date and time")
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def resolve(self, row):
+        """Returns an unsaved flight and crew ids of a row"""
+        route_id = self.routes.get((row.get("source"), row.get("destination")))
+        if route_id is None:
+            raise InvalidRow(
+                f"unknown route {row.get('source')} - {row.get('destination')}"
+            )
+
+        airplane_id = self.airplanes.get(row.get("airplane"))
+        if airplane_id is None:
+            raise InvalidRow(f"unknown airplane {row.get('airplane')}")
+
+        departure_time = self._parse_time(row, "departure_time")
+        arrival_time = self._parse_time(row, "arrival_time")
+        if arrival_time <= departure_time:
+            raise InvalidRow("arrival_time must be after departure_time")
+
+        crew_ids = []
+        for name in row.get("crews") or ():
+            crew_id = self.crews.get(_crew_key(name))
+            if crew_id is None:
+                raise InvalidRow(f"unknown or ambiguous crew member {name}")
+            crew_ids.append(crew_id)
+
+        flight = Flight(
+            route_id=route_id,
+            airplane_id=airplane_id,
+            departure_time=departure_time,
+            arrival_time=arrival_time,
+        )
+        return flight, crew_ids
+
+    def import_batch(self, resolved):
+        """Inserts (flight, crew ids) pairs, returns the created count"""
+        return insert_flights(resolved)
+
+
+def flight_key(flight):
+    return (
+        flight.route_id,
+        flight.airplane_id,
+        flight.departure_time,
+        flight.arrival_time,
+    )
+
+
+def existing_flight_ids(flights):
+    """Maps keys of flights already in the database to their ids"""
+    departure_times = [flight.departure_time for flight in flights]
+    return {
+        (route_id, airplane_id, departure_time, arrival_time): flight_id
+        for (
+            flight_id, route_id, airplane_id, departure_time, arrival_time
+        ) in Flight.objects.filter(
+            route_id__in={flight.route_id for flight in flights},
+            departure_time__gte=min(departure_times),
+            departure_time__lte=max(departure_times),
+        ).values_list(
+            "id", "route_id", "airplane_id", "departure_time", "arrival_time"
+        )
+    }
+
+
+def insert_flights(resolved):
+    """Inserts new (flight, crew ids) pairs, returns the created count.
+
+    Flights equal to existing ones on the unique fields are skipped along
+    with their crews, so the same pairs can be inserted again safely. The
+    count is the number of flights found after the insert that were not
+    there before it, so rows skipped on conflict are not counted.
+    """
+    if not resolved:
+        return 0
+
+    pending = {}
+    for flight, crew_ids in resolved:
+        pending.setdefault(flight_key(flight), (flight, crew_ids))
+
+    with transaction.atomic():
+        flights = [flight for flight, _ in pending.values()]
+        before = existing_flight_ids(flights)
+        new = {
+            key: pair for key, pair in pending.items() if key not in before
+        }
+        if not new:
+            return 0
+
+        Flight.objects.bulk_create(
+            [flight for flight, _ in new.values()], ignore_conflicts=True
+        )
+        # Primary keys are not returned with ignore_conflicts.
+        after = existing_flight_ids(flights)
+        created = {key: after[key] for key in new if key in after}
+        Flight.crews.through.objects.bulk_create(
+            [
+                Flight.crews.through(flight_id=flight_id, crew_id=crew_id)
+                for key, flight_id in created.items()
+                for crew_id in dict.fromkeys(new[key][1])
+            ],
+            ignore_conflicts=True,
+        )
+
+    return len(created)
@@ -0,0 +1,197 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque, namedtuple
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from airport.cache import VERSION_KEY, get_version, increment_version
+from airport.models import Airport, Flight, Route
+
+
+Leg = namedtuple(
+    "Leg", ("flight_id", "source", "destination", "departure", "arrival")
+)
+
+
+class FlightIndex:
+    """In-memory route graph with flight departures bucketed by day.
+
+    The graph and the ``max_days`` most recently used days are kept for
+    ``refresh_interval`` seconds. ``invalidate()`` increments a version
+    shared through the cache once the transaction commits, and every
+    process drops what it loaded when it sees a new version.
+    """
+
+    version_key = VERSION_KEY.format("flight_index")
+
+    def __init__(self, refresh_interval=300, max_connection_time=None,
+                 max_days=64):
+        self.refresh_interval = refresh_interval
+        self.max_connection_time = max_connection_time or timedelta(hours=24)
+        self.max_days = max_days
+        self._lock = threading.Lock()
+        self._version = None
+        self._graph = None
+        self._days = OrderedDict()
+
+    def invalidate(self, using=None):
+        transaction.on_commit(
+            lambda: increment_version(self.version_key), using=using
+        )
+
+    def sync(self):
+        """Drops data loaded before the latest shared invalidation"""
+        version = get_version(self.version_key)
+        if version == self._version:
+            return
+
+        with self._lock:
+            if version != self._version:
+                self._graph = None
+                self._days.clear()
+                self._version = version
+
+    def _is_fresh(self, loaded):
+        return loaded is not None and (
+            time.monotonic() - loaded["loaded_at"] < self.refresh_interval
+        )
+
+    def _get_graph(self):
+        graph = self._graph
+        if self._is_fresh(graph):
+            return graph
+
+        with self._lock:
+            # Another thread may have loaded it while this one waited.
+            graph = self._graph
+            if self._is_fresh(graph):
+                return graph
+
+            city_airports = defaultdict(set)
+            for airport_id, city in Airport.objects.values_list(
+                "id", "closest_big_city__name"
+            ):
+                city_airports[city].add(airport_id)
+
+            incoming = defaultdict(set)
+            for source, destination in Route.objects.values_list(
+                "source_id", "destination_id"
+            ):
+                incoming[destination].add(source)
+
+            graph = self._graph = {
+                "loaded_at": time.monotonic(),
+                "city_airports": dict(city_airports),
+                "incoming": dict(incoming),
+            }
+            return graph
+
+    @staticmethod
+    def _load_day(day):
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        legs = defaultdict(list)
+        for leg in Flight.objects.filter(
+            departure_time__gte=start,
+            departure_time__lt=start + timedelta(days=1),
+        ).order_by("departure_time").values_list(
+            "id",
+            "route__source_id",
+            "route__destination_id",
+            "departure_time",
+            "arrival_time",
+        ):
+            leg = Leg(*leg)
+            legs[leg.source].append(leg)
+
+        return {
+            airport_id: ([leg.departure for leg in airport_legs], airport_legs)
+            for airport_id, airport_legs in legs.items()
+        }
+
+    def _get_day(self, day):
+        """Returns {airport id: (departure times, legs)} sorted by time"""
+        with self._lock:
+            bucket = self._days.get(day)
+            if not self._is_fresh(bucket):
+                bucket = self._days[day] = {
+                    "loaded_at": time.monotonic(),
+                    "departures": self._load_day(day),
+                }
+            self._days.move_to_end(day)
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+            return bucket["departures"]
+
+    def departures(self, airport_id, earliest, latest):
+        """Yields legs leaving the airport within [earliest, latest]"""
+        day = timezone.localdate(earliest)
+        while day <= timezone.localdate(latest):
+            times, legs = self._get_day(day).get(airport_id, ((), ()))
+            start = bisect.bisect_left(times, earliest)
+            end = bisect.bisect_right(times, latest)
+            yield from legs[start:end]
+            day += timedelta(days=1)
+
+    def airports_in_city(self, city):
+        self.sync()
+        return self._get_graph()["city_airports"].get(city, set())
+
+    def _hops_to(self, destinations, max_hops):
+        """Fewest route hops from every airport to any of destinations"""
+        incoming = self._get_graph()["incoming"]
+        hops = dict.fromkeys(destinations, 0)
+        queue = deque(destinations)
+
+        while queue:
+            airport_id = queue.popleft()
+            if hops[airport_id] == max_hops:
+                continue
+            for source in incoming.get(airport_id, ()):
+                if source not in hops:
+                    hops[source] = hops[airport_id] + 1
+                    queue.append(source)
+
+        return hops
+
+    def search(self, sources, destinations, day, max_stops=2,
+               min_connection_time=timedelta(hours=1)):
+        """Returns itineraries (lists of legs) departing on the given day"""
+        self.sync()
+        max_legs = max_stops + 1
+        hops = self._hops_to(set(destinations), max_legs)
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        itineraries = []
+
+        def extend(path, airport_id, earliest, latest, visited):
+            legs_left = max_legs - len(path)
+            for leg in self.departures(airport_id, earliest, latest):
+                if leg.destination in visited:
+                    continue
+                if hops.get(leg.destination, max_legs + 1) >= legs_left:
+                    continue
+                if leg.destination in destinations:
+                    itineraries.append(path + [leg])
+                    continue
+
+                ready_at = leg.arrival + min_connection_time
+                extend(
+                    path + [leg],
+                    leg.destination,
+                    ready_at,
+                    ready_at + self.max_connection_time,
+                    visited | {leg.destination},
+                )
+
+        latest = start + timedelta(days=1) - timedelta(microseconds=1)
+        for source in sources:
+            if source in hops:
+                extend([], source, start, latest, {source})
+
+        itineraries.sort(key=lambda legs: (legs[-1].arrival, len(legs)))
+        return itineraries
+
+
+flight_index = FlightIndex()
@@ -0,0 +1,102 @@
+import gzip
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from airport.bulk_load import BulkLoader, iter_json_array
+from airport.models import Flight, Ticket
+from airport.signals import notify_bulk_create
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Load JSON fixtures like loaddata, but streamed and written with"
+        " bulk queries. Model save() methods and signals are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "fixtures", nargs="+", help="JSON fixture files, may be gzipped"
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database to load the fixtures into",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Number of objects of a model written per query",
+        )
+        parser.add_argument(
+            "-e",
+            "--exclude",
+            action="append",
+            default=[],
+            help="App label or app_label.ModelName to skip, can repeat",
+        )
+
+    @staticmethod
+    def open_fixture(path):
+        if path.endswith(".gz"):
+            return gzip.open(path, "rt", encoding="utf-8")
+        return open(path, encoding="utf-8")
+
+    def handle(self, *args, **options):
+        fixtures = options["fixtures"]
+        excluded = {label.lower() for label in options["exclude"]}
+        using = options["database"]
+        connection = connections[using]
+        loader = BulkLoader(using=using, batch_size=options["batch_size"])
+        start = time.perf_counter()
+
+        with transaction.atomic(using=using):
+            # Objects may point to ones further on in the stream, so
+            # foreign keys are checked once everything is written.
+            with connection.constraint_checks_disabled():
+                for path in fixtures:
+                    try:
+                        with self.open_fixture(path) as file:
+                            for data in iter_json_array(file):
+                                label = data["model"].lower()
+                                if (
+                                    label in excluded
+                                    or label.split(".")[0] in excluded
+                                ):
+                                    continue
+                                loader.add(data)
+                    except (
+                        DeserializationError, KeyError, ValueError
+                    ) as error:
+                        raise CommandError(
+                            f"Problem installing fixture '{path}': {error}"
+                        )
+                counts = loader.finish()
+
+            connection.check_constraints(
+                table_names=[model._meta.db_table for model in loader.models]
+            )
+
+        for model in loader.models:
+            if model._meta.app_label == "airport":
+                notify_bulk_create(model, using)
+        if Flight in loader.models or Ticket in loader.models:
+            # Fixtures do not carry the sold seats kept up to date by orders.
+            call_command(
+                "reconcile_seats", database=using, stdout=self.stdout
+            )
+
+        total = sum(counts.values())
+        elapsed = time.perf_counter() - start
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f"  {label}: {count}", ending="\n")
+        self.stdout.write(
+            f"Installed {total} object(s) from {len(fixtures)} fixture(s)"
+            f" in {elapsed:.1f} s"
+            f" ({total / max(elapsed, 1e-9):.0f} objects/s).",
+            ending="\n",
+        )
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from airport.schedules import HORIZON, expand_schedules
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Create flights of recurring schedules for the coming days."
+        " Meant to run daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=HORIZON.days,
+            help="Number of days ahead to create flights for",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of flights written per insert",
+        )
+
+    def handle(self, *args, **options):
+        created = expand_schedules(
+            horizon=timedelta(days=options["days"]),
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(f"Created {created} flight(s).", ending="\n")
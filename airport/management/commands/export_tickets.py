@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from airport.exports import EXPORT_FORMATS, ticket_export_rows
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Export tickets of all orders with flight, route and airplane"
+        " details as CSV or NDJSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=sorted(EXPORT_FORMATS),
+            default="csv",
+            help="Export format",
+        )
+        parser.add_argument(
+            "--output", help="File to write, standard output by default"
+        )
+        parser.add_argument(
+            "--created-from", help="Export orders created on or after it"
+        )
+        parser.add_argument(
+            "--created-to", help="Export orders created on or before it"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of rows fetched from the database at a time",
+        )
+
+    @staticmethod
+    def _date(options, name):
+        value = options[name]
+        if value is None:
+            return None
+
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            option = name.replace("_", "-")
+            raise CommandError(f"--{option} must be YYYY-MM-DD")
+        return day
+
+    def handle(self, *args, **options):
+        lines = EXPORT_FORMATS[options["format"]][0]
+        rows = ticket_export_rows(
+            self._date(options, "created_from"),
+            self._date(options, "created_to"),
+            chunk_size=options["chunk_size"],
+        )
+
+        if options["output"]:
+            with open(
+                options["output"], "w", newline="", encoding="utf-8"
+            ) as file:
+                file.writelines(lines(rows))
+        else:
+            for line in lines(rows):
+                self.stdout.write(line, ending="")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from airport.images import generate_variants, missing_variants
+from airport.models import Airplane, Airport
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Generate the resized variants of airport and airplane images"
+        " that have none, e.g. uploaded before variants existed"
+    )
+
+    def handle(self, *args, **options):
+        for model in (Airport, Airplane):
+            done = failed = 0
+            for obj in missing_variants(model):
+                try:
+                    generate_variants(model, obj.pk, obj.image.name)
+                except (OSError, ValueError) as error:
+                    failed += 1
+                    self.stderr.write(
+                        f"{model._meta.label} {obj.pk}: {error}", ending="\n"
+                    )
+                else:
+                    done += 1
+
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: {done} generated,"
+                f" {failed} failed",
+                ending="\n",
+            )
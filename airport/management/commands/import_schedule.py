@@ -0,0 +1,130 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from airport.imports import (
+    READERS,
+    InvalidRow,
+    ScheduleImporter,
+    UnreadableRow,
+    read_schedule,
+)
+from airport.models import Crew, Flight
+from airport.signals import notify_bulk_create
+from airport.utils import batched
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Import flights with their crews from a CSV or NDJSON schedule."
+        " Rows need source, destination, airplane, departure_time,"
+        " arrival_time and crews (names separated by semicolons in CSV,"
+        " a list in NDJSON)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Schedule file to import")
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            help="Schedule format, guessed from the file suffix by default",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows written per insert",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help=(
+                "File recording imported rows to resume from,"
+                " <path>.checkpoint by default"
+            ),
+        )
+        parser.add_argument(
+            "--skip-invalid",
+            action="store_true",
+            help="Report invalid rows and go on instead of stopping",
+        )
+
+    @staticmethod
+    def _source_id(path):
+        return {"path": os.path.abspath(path), "size": os.path.getsize(path)}
+
+    def read_checkpoint(self, checkpoint, path):
+        """Returns the number of rows imported by an interrupted run"""
+        if not os.path.exists(checkpoint):
+            return 0
+
+        with open(checkpoint) as file:
+            state = json.load(file)
+        if state["source"] != self._source_id(path):
+            raise CommandError(
+                f"Checkpoint {checkpoint} belongs to another file,"
+                " delete it to start over."
+            )
+        return state["rows"]
+
+    def write_checkpoint(self, checkpoint, path, rows):
+        temporary = f"{checkpoint}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({"source": self._source_id(path), "rows": rows}, file)
+        os.replace(temporary, checkpoint)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+        done = self.read_checkpoint(checkpoint, path)
+        if done:
+            self.stdout.write(f"Resuming after row {done}.", ending="\n")
+
+        importer = ScheduleImporter()
+        rows = islice(read_schedule(path, options["format"]), done, None)
+        created = invalid = imported = 0
+        start = time.perf_counter()
+
+        try:
+            for batch in batched(rows, options["batch_size"]):
+                resolved = []
+                for number, row in enumerate(batch, start=done + 1):
+                    try:
+                        resolved.append(importer.resolve(row))
+                    except InvalidRow as error:
+                        if not options["skip_invalid"]:
+                            raise CommandError(f"Row {number}: {error}")
+                        invalid += 1
+                        self.stderr.write(f"Row {number}: {error}")
+
+                created += importer.import_batch(resolved)
+                done += len(batch)
+                imported += len(batch)
+                self.write_checkpoint(checkpoint, path, done)
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{done} rows, {created} flights created,"
+                    f" {imported / elapsed:.0f} rows/s",
+                    ending="\n",
+                )
+        except (csv.Error, UnreadableRow) as error:
+            raise CommandError(f"Unreadable row after row {done}: {error}")
+        finally:
+            if created:
+                notify_bulk_create(Flight)
+                notify_bulk_create(Crew)
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Imported {imported} rows in {elapsed:.1f} s"
+            f" ({imported / max(elapsed, 1e-9):.0f} rows/s):"
+            f" {created} flights created, {invalid} invalid rows skipped.",
+            ending="\n",
+        )
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from airport.models import Flight
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Rebuild sold seats counters and seat maps of flights"
+        " from their tickets"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database whose flights are reconciled",
+        )
+        parser.add_argument(
+            "--flights",
+            help="Ids of flights separated by commas to reconcile",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of flights rebuilt per query",
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        flight_ids = (
+            Flight.objects.using(using)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+        if options["flights"]:
+            flight_ids = flight_ids.filter(
+                pk__in=[
+                    int(str_id) for str_id in options["flights"].split(",")
+                ]
+            )
+
+        flight_ids = list(flight_ids)
+        batch_size = options["batch_size"]
+        fixed = 0
+
+        for start in range(0, len(flight_ids), batch_size):
+            fixed += Flight.rebuild_seat_inventories(
+                flight_ids[start:start + batch_size], using
+            )
+
+        self.stdout.write(f"Reconciled {fixed} flight(s).", ending="\n")
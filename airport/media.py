@@ -0,0 +1,83 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+
+# Content addressed files never change, so clients may keep them a year.
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Names files by the SHA-256 of their content.
+
+    The directory and extension of the requested name are kept. Saving
+    content that is already stored writes nothing and returns the name of
+    the existing file, so a URL always points to the same bytes.
+    """
+
+    @staticmethod
+    def content_hash(content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        directory, filename = os.path.split(name)
+        _, extension = os.path.splitext(filename)
+        name = posixpath.join(
+            directory, f"{self.content_hash(content)}{extension.lower()}"
+        )
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+def serve_media(request, path):
+    """Serves an uploaded file with immutable cache headers.
+
+    With MEDIA_ACCEL_REDIRECT set, an existing file is handed to the web
+    server in front of Django (nginx ``internal`` location) through an
+    X-Accel-Redirect header. Without it, the file is streamed through
+    Python with DEBUG on only, as django.views.static.serve is meant for.
+    """
+    try:
+        safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Invalid path")
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # Checked here, or a missing file would be cached for a year.
+        if not default_storage.exists(path):
+            raise Http404("File not found")
+        content_type, _ = mimetypes.guess_type(path)
+        response = HttpResponse(
+            content_type=content_type or "application/octet-stream"
+        )
+        response["X-Accel-Redirect"] = (
+            settings.MEDIA_ACCEL_REDIRECT.rstrip("/") + "/" + path
+        )
+    elif settings.DEBUG:
+        response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    else:
+        raise Http404("Media is served by the web server")
+
+    patch_cache_control(
+        response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+    )
+    return response
@@ -0,0 +1,36 @@
+# Generated by Django 4.0.4 on 2026-10-17 06:45
+
+from django.db import migrations, models
+
+
+def fill_seat_maps(apps, schema_editor):
+    # The packing is inlined, so later changes to airport.seat_map do not
+    # change what this migration writes: one bit per seat in row-major
+    # order, lowest bit first.
+    Flight = apps.get_model("airport", "Flight")
+
+    for flight in Flight.objects.select_related("airplane").iterator():
+        rows = flight.airplane.rows
+        seats_in_row = flight.airplane.seats_in_row
+        bits = bytearray((rows * seats_in_row + 7) // 8)
+        for row, seat in flight.tickets.values_list("row", "seat"):
+            if 1 <= row <= rows and 1 <= seat <= seats_in_row:
+                index = (row - 1) * seats_in_row + seat - 1
+                bits[index >> 3] |= 1 << (index & 7)
+        flight.seat_map = bytes(bits)
+        flight.save(update_fields=["seat_map"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("airport", "0009_flight_seats_sold"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="flight",
+            name="seat_map",
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.RunPython(fill_seat_maps, migrations.RunPython.noop),
+    ]
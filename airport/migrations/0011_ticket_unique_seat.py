@@ -0,0 +1,61 @@
+# Generated by Django 4.0.4 on 2026-10-17 06:46
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def check_double_booked_tickets(apps, schema_editor):
+    # Seats could be sold twice before the unique index, which can not be
+    # created over such rows. They are customer bookings, so they are
+    # listed for someone to reseat or refund instead of being deleted.
+    Ticket = apps.get_model("airport", "Ticket")
+
+    duplicates = list(
+        Ticket.objects.order_by()
+        .values("flight", "row", "seat")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+        .order_by("flight", "row", "seat")
+    )
+    if not duplicates:
+        return
+
+    lines = []
+    for duplicate in duplicates:
+        tickets = Ticket.objects.filter(
+            flight=duplicate["flight"],
+            row=duplicate["row"],
+            seat=duplicate["seat"],
+        ).order_by("pk")
+        lines.append(
+            f"  flight {duplicate['flight']} row {duplicate['row']}"
+            f" seat {duplicate['seat']}: "
+            + ", ".join(
+                f"ticket {ticket_id} (order {order_id})"
+                for ticket_id, order_id in tickets.values_list(
+                    "pk", "order_id"
+                )
+            )
+        )
+    raise ValueError(
+        "Seats are sold more than once, so tickets can not be made unique"
+        " per seat. Move or cancel all but one ticket of each seat, then"
+        " run reconcile_seats and migrate again:\n" + "\n".join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0010_flight_seat_map'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            check_double_booked_tickets, migrations.RunPython.noop
+        ),
+        migrations.AlterUniqueTogether(
+            name='ticket',
+            unique_together={('flight', 'row', 'seat')},
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.0.4 on 2026-10-17 07:04
+
+import airport.models
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0014_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlightSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days_of_week', models.PositiveSmallIntegerField(help_text='Bitmask of operating days: Monday is 1, Sunday is 64.', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(127)])),
+                ('departure_time', models.TimeField(help_text='Local departure time.')),
+                ('time_zone', models.CharField(default='UTC', max_length=63, validators=[airport.models.validate_time_zone])),
+                ('duration', models.DurationField()),
+                ('valid_from', models.DateField()),
+                ('valid_until', models.DateField()),
+                ('expanded_until', models.DateField(blank=True, editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('airplane', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='airport.airplane')),
+                ('crews', models.ManyToManyField(blank=True, related_name='schedules', to='airport.crew')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='airport.route')),
+            ],
+            options={
+                'ordering': ['valid_from', 'departure_time'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.4 on 2026-10-17 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airport', '0015_flightschedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airplane',
+            name='image_variants',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='image_variants',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+    ]
@@ -1,28 +1,36 @@
 import os
-import uuid
-from django.db import models
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import F, Q
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.utils.text import slugify
-from django.core.validators import MinValueValidator
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.utils.timezone import now
 
+from airport.cache import bump_model_version
+from airport.seat_map import SeatMap, SetSeatBits
+
+try:
+    import zoneinfo
+except ImportError:
+    # Python 3.8, used by the Docker image; Django 4.0 installs the backport.
+    from backports import zoneinfo
 
-def airport_image_file_path(instance, filename):
-    _, extension = os.path.splitext(filename)
-    filename = f"{slugify(instance.name)}-{uuid.uuid4()}{extension}"
 
+def airport_image_file_path(instance, filename):
+    # The storage renames the file after its content, see airport.media.
     return os.path.join("uploads/airports/", filename)
 
 
 def airplane_image_file_path(instance, filename):
-    _, extension = os.path.splitext(filename)
-    filename = f"{slugify(instance.name)}-{uuid.uuid4()}{extension}"
-
+    # The storage renames the file after its content, see airport.media.
     return os.path.join("uploads/airplanes/", filename)
 
 
 class Country(models.Model):
     name = models.CharField(max_length=83, unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name_plural = "countries"
@@ -37,6 +45,7 @@ class City(models.Model):
     country = models.ForeignKey(
         Country, on_delete=models.CASCADE, related_name="cities"
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name_plural = "cities"
@@ -58,6 +67,9 @@ class Airport(models.Model):
         blank=True,
         upload_to=airport_image_file_path
     )
+    # Names of the resized copies of the image, see airport.images.
+    image_variants = models.JSONField(default=dict, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["name"]
@@ -69,6 +81,7 @@ class Airport(models.Model):
 class Crew(models.Model):
     first_name = models.CharField(max_length=83)
     last_name = models.CharField(max_length=83)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -76,6 +89,7 @@ class Crew(models.Model):
 
 class AirplaneType(models.Model):
     name = models.CharField(max_length=133, unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["name"]
@@ -94,10 +108,28 @@ class Order(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "id"],
+                name="order_user_created_id_idx",
+            ),
+        ]
 
     def __str__(self):
         return str(self.created_at)
 
+    def cancel(self):
+        """Delete the order and release the seats taken by its tickets"""
+        with transaction.atomic():
+            places_by_flight = defaultdict(list)
+            for flight_id, row, seat in self.tickets.values_list(
+                "flight_id", "row", "seat"
+            ):
+                places_by_flight[flight_id].append((row, seat))
+
+            Flight.update_seat_inventory(places_by_flight, release=True)
+            self.delete()
+
 
 class Route(models.Model):
     source = models.ForeignKey(
@@ -111,6 +143,7 @@ class Route(models.Model):
         related_name="destination_routes"
     )
     distance = models.IntegerField(validators=[MinValueValidator(10)])
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ("source", "destination")
@@ -135,6 +168,8 @@ class Airplane(models.Model):
     image = models.ImageField(
         null=True, blank=True, upload_to=airplane_image_file_path
     )
+    image_variants = models.JSONField(default=dict, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["name"]
@@ -146,6 +181,41 @@ class Airplane(models.Model):
     def capacity(self):
         return self.rows * self.seats_in_row
 
+    @staticmethod
+    def validate_layout(airplane_id, rows, seats_in_row, error_to_raise):
+        """Refuses a layout that leaves sold seats of the airplane out"""
+        if airplane_id is None:
+            return
+
+        if Ticket.objects.filter(
+            Q(row__gt=rows) | Q(seat__gt=seats_in_row),
+            flight__airplane_id=airplane_id,
+        ).exists():
+            raise error_to_raise(
+                "Tickets are sold for seats outside of this layout: "
+                f"(rows, seats_in_row): ({rows}, {seats_in_row})"
+            )
+
+    def clean(self):
+        Airplane.validate_layout(
+            self.pk, self.rows, self.seats_in_row, ValidationError
+        )
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            layout_changed = (
+                self.pk is not None
+                and Airplane.objects.filter(pk=self.pk)
+                .exclude(rows=self.rows, seats_in_row=self.seats_in_row)
+                .exists()
+            )
+            super().save(*args, **kwargs)
+            # Seat maps are sized and indexed by the layout.
+            if layout_changed:
+                Flight.rebuild_seat_inventories(
+                    list(self.flights.values_list("pk", flat=True))
+                )
+
 
 class Flight(models.Model):
     route = models.ForeignKey(
@@ -157,16 +227,227 @@ class Flight(models.Model):
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
     crews = models.ManyToManyField(Crew, related_name="flights")
+    seats_sold = models.PositiveIntegerField(default=0, editable=False)
+    seat_map = models.BinaryField(default=bytes, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = (
             "route", "airplane", "departure_time", "arrival_time"
         )
         ordering = ["departure_time"]
+        indexes = [
+            models.Index(
+                fields=["departure_time", "id"],
+                name="flight_departure_id_idx",
+            ),
+            models.Index(
+                fields=["route", "departure_time"],
+                name="flight_route_departure_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.route} {self.departure_time}"
 
+    @property
+    def seats_available(self):
+        return self.airplane.capacity - self.seats_sold
+
+    @staticmethod
+    def validate_airplane(flight_id, airplane, error_to_raise):
+        """Refuses an airplane that leaves sold seats of the flight out"""
+        if flight_id is None:
+            return
+
+        if Ticket.objects.filter(
+            Q(row__gt=airplane.rows) | Q(seat__gt=airplane.seats_in_row),
+            flight_id=flight_id,
+        ).exists():
+            raise error_to_raise(
+                {
+                    "airplane": "Tickets are sold for seats outside of "
+                    "this airplane: (rows, seats_in_row): "
+                    f"({airplane.rows}, {airplane.seats_in_row})"
+                }
+            )
+
+    def clean(self):
+        Flight.validate_airplane(self.pk, self.airplane, ValidationError)
+
+    def get_seat_map(self):
+        return SeatMap(
+            self.airplane.rows, self.airplane.seats_in_row, self.seat_map
+        )
+
+    def rebuild_seat_inventory(self, places=None):
+        """Recounts sold seats and the seat map from the flight tickets.
+
+        Returns True if the stored inventory was out of date.
+        """
+        if places is None:
+            places = list(self.tickets.values_list("row", "seat"))
+
+        seat_map = SeatMap(self.airplane.rows, self.airplane.seats_in_row)
+        for place in places:
+            if place in seat_map:
+                seat_map.occupy(*place)
+
+        changed = (
+            self.seats_sold != len(places)
+            or bytes(self.seat_map) != seat_map.to_bytes()
+        )
+        self.seats_sold = len(places)
+        self.seat_map = seat_map.to_bytes()
+        return changed
+
+    @staticmethod
+    def rebuild_seat_inventories(flight_ids, using=DEFAULT_DB_ALIAS):
+        """Rebuilds the seat inventory of flights from their tickets.
+
+        Returns the number of flights whose inventory was out of date.
+        """
+        with transaction.atomic(using=using):
+            places_by_flight = defaultdict(list)
+            for flight_id, row, seat in (
+                Ticket.objects.using(using)
+                .filter(flight_id__in=flight_ids)
+                .values_list("flight_id", "row", "seat")
+            ):
+                places_by_flight[flight_id].append((row, seat))
+
+            changed = [
+                flight
+                for flight in Flight.objects.using(using)
+                .select_for_update(of=("self",))
+                .select_related("airplane")
+                .filter(pk__in=flight_ids)
+                .order_by("pk")
+                if flight.rebuild_seat_inventory(places_by_flight[flight.pk])
+            ]
+            updated_at = now()
+            for flight in changed:
+                flight.updated_at = updated_at
+            Flight.objects.using(using).bulk_update(
+                changed, ["seat_map", "seats_sold", "updated_at"]
+            )
+
+        if changed:
+            bump_model_version(Flight, using)
+        return len(changed)
+
+    @staticmethod
+    def update_seat_inventory(places_by_flight, release=False):
+        """Marks (row, seat) places per flight id as sold or released.
+
+        Counters and seat maps are changed by one UPDATE per flight,
+        computed by the database, so no flight row is read and locked
+        beforehand. Taken seats are already decided by the unique index
+        of the tickets.
+        """
+        layouts = Flight.objects.filter(pk__in=places_by_flight).values_list(
+            "pk", "airplane__rows", "airplane__seats_in_row"
+        )
+        updated_at = now()
+        # Flights are updated in a stable order so that concurrent orders
+        # touching the same flights can not deadlock each other.
+        for flight_id, rows, seats_in_row in sorted(layouts):
+            seat_map = SeatMap(rows, seats_in_row)
+            places = places_by_flight[flight_id]
+            Flight.objects.filter(pk=flight_id).update(
+                seats_sold=F("seats_sold")
+                + (-len(places) if release else len(places)),
+                seat_map=SetSeatBits(
+                    F("seat_map"),
+                    len(seat_map.bits),
+                    [seat_map.index(row, seat) for row, seat in places],
+                    value=not release,
+                ),
+                updated_at=updated_at,
+            )
+
+        bump_model_version(Flight)
+
+
+def validate_time_zone(value):
+    if value not in zoneinfo.available_timezones():
+        raise ValidationError(f"Unknown time zone: {value}")
+
+
+class FlightSchedule(models.Model):
+    """Recurring departures that are materialized as flights ahead of time"""
+
+    DAYS_OF_WEEK = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+    route = models.ForeignKey(
+        Route, on_delete=models.CASCADE, related_name="schedules"
+    )
+    airplane = models.ForeignKey(
+        Airplane, on_delete=models.CASCADE, related_name="schedules"
+    )
+    days_of_week = models.PositiveSmallIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(127)],
+        help_text="Bitmask of operating days: Monday is 1, Sunday is 64.",
+    )
+    departure_time = models.TimeField(help_text="Local departure time.")
+    time_zone = models.CharField(
+        max_length=63, default="UTC", validators=[validate_time_zone]
+    )
+    duration = models.DurationField()
+    valid_from = models.DateField()
+    valid_until = models.DateField()
+    crews = models.ManyToManyField(Crew, related_name="schedules", blank=True)
+    expanded_until = models.DateField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ["valid_from", "departure_time"]
+
+    def __str__(self):
+        days = ",".join(
+            day
+            for index, day in enumerate(self.DAYS_OF_WEEK)
+            if self.days_of_week & (1 << index)
+        )
+        return f"{self.route} {days} {self.departure_time}"
+
+    def clean(self):
+        if (
+            self.valid_from
+            and self.valid_until
+            and self.valid_until < self.valid_from
+        ):
+            raise ValidationError(
+                {"valid_until": "valid_until can not be before valid_from"}
+            )
+        if self.duration is not None and self.duration <= timedelta(0):
+            raise ValidationError({"duration": "duration must be positive"})
+
+    def departures(self, start, end):
+        """Yields UTC departure times of operating days in [start, end]"""
+        zone = zoneinfo.ZoneInfo(self.time_zone)
+        day = max(start, self.valid_from)
+        while day <= min(end, self.valid_until):
+            if self.days_of_week & (1 << day.weekday()):
+                # Converted to UTC so that adding a duration across a
+                # daylight saving change keeps the real flight time.
+                yield datetime.combine(
+                    day, self.departure_time, tzinfo=zone
+                ).astimezone(timezone.utc)
+            day += timedelta(days=1)
+
+    def flights(self, start, end):
+        """Returns unsaved flights of the days in [start, end]"""
+        return [
+            Flight(
+                route_id=self.route_id,
+                airplane_id=self.airplane_id,
+                departure_time=departure,
+                arrival_time=departure + self.duration,
+            )
+            for departure in self.departures(start, end)
+        ]
+
 
 class Ticket(models.Model):
     row = models.IntegerField()
@@ -178,6 +459,9 @@ class Ticket(models.Model):
         Order, on_delete=models.CASCADE, related_name="tickets"
     )
 
+    class Meta:
+        unique_together = ("flight", "row", "seat")
+
     def __str__(self):
         return str(self.flight)
 
@@ -198,6 +482,36 @@ class Ticket(models.Model):
                     }
                 )
 
+    @staticmethod
+    def bulk_book(tickets, error_to_raise=ValidationError):
+        """Validates unsaved tickets in memory and inserts them at once"""
+        flights = {
+            ticket.flight_id: ticket.flight
+            for ticket in tickets
+            if Ticket.flight.is_cached(ticket)
+            and Flight.airplane.is_cached(ticket.flight)
+        }
+        missing_flight_ids = {ticket.flight_id for ticket in tickets} - set(
+            flights
+        )
+        if missing_flight_ids:
+            flights.update(
+                Flight.objects.select_related("airplane").in_bulk(
+                    missing_flight_ids
+                )
+            )
+
+        for ticket in tickets:
+            ticket.flight = flights[ticket.flight_id]
+            Ticket.validate_ticket(
+                ticket.row,
+                ticket.seat,
+                ticket.flight.airplane,
+                error_to_raise,
+            )
+
+        return Ticket.objects.bulk_create(tickets)
+
     def clean(self):
         Ticket.validate_ticket(
             self.row,
@@ -213,7 +527,9 @@ class Ticket(models.Model):
         using=None,
         update_fields=None,
     ):
-        self.full_clean()
+        # Seat uniqueness is left to the database index, which is
+        # race-free and saves a lookup query per ticket.
+        self.full_clean(validate_unique=False)
         return super(Ticket, self).save(
             force_insert, force_update, using, update_fields
         )
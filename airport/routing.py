@@ -0,0 +1,188 @@
+import heapq
+import threading
+import time
+from array import array
+from collections import deque
+from functools import lru_cache
+
+from django.db import transaction
+
+from airport.cache import VERSION_KEY, get_version, increment_version
+from airport.models import Route
+
+
+UNREACHABLE = -1
+
+
+class RouteGraph:
+    """Route network stored as compressed sparse row (CSR) arrays.
+
+    Airports are renumbered to dense indexes; the routes leaving airport
+    ``i`` are ``targets[offsets[i]:offsets[i + 1]]`` together with the
+    matching ``sources``, ``distances`` and ``route_ids``. Single-source
+    search trees are cached, so repeated queries from one airport only
+    walk a path.
+    """
+
+    def __init__(self, routes, tree_cache_size=256):
+        """Builds the graph from (route id, source, destination, distance)"""
+        routes = sorted(routes, key=lambda route: route[1])
+        airport_ids = sorted(
+            {route[1] for route in routes} | {route[2] for route in routes}
+        )
+        self.airport_ids = array("q", airport_ids)
+        self.index = {
+            airport_id: index for index, airport_id in enumerate(airport_ids)
+        }
+
+        self.offsets = array("l", [0] * (len(airport_ids) + 1))
+        self.sources = array("l")
+        self.targets = array("l")
+        self.distances = array("l")
+        self.route_ids = array("q")
+        for route_id, source, destination, distance in routes:
+            self.offsets[self.index[source] + 1] += 1
+            self.sources.append(self.index[source])
+            self.targets.append(self.index[destination])
+            self.distances.append(distance)
+            self.route_ids.append(route_id)
+        for index in range(len(airport_ids)):
+            self.offsets[index + 1] += self.offsets[index]
+
+        self.distance_tree = lru_cache(maxsize=tree_cache_size)(
+            self._distance_tree
+        )
+        self.hops_tree = lru_cache(maxsize=tree_cache_size)(self._hops_tree)
+
+    @classmethod
+    def from_database(cls):
+        return cls(
+            Route.objects.values_list(
+                "id", "source_id", "destination_id", "distance"
+            ).iterator()
+        )
+
+    def _distance_tree(self, source):
+        """Dijkstra from source: (distance, edge used to reach) per airport"""
+        distance = array("q", [UNREACHABLE]) * len(self.airport_ids)
+        through = array("l", [UNREACHABLE]) * len(self.airport_ids)
+        distance[source] = 0
+        queue = [(0, source)]
+
+        while queue:
+            current, airport = heapq.heappop(queue)
+            if current > distance[airport]:
+                continue
+            edges = range(self.offsets[airport], self.offsets[airport + 1])
+            for edge in edges:
+                target = self.targets[edge]
+                candidate = current + self.distances[edge]
+                known = distance[target]
+                if known == UNREACHABLE or candidate < known:
+                    distance[target] = candidate
+                    through[target] = edge
+                    heapq.heappush(queue, (candidate, target))
+
+        return distance, through
+
+    def _hops_tree(self, source):
+        """Breadth-first search from source: edge used to reach airports"""
+        through = array("l", [UNREACHABLE]) * len(self.airport_ids)
+        visited = bytearray(len(self.airport_ids))
+        visited[source] = 1
+        queue = deque([source])
+
+        while queue:
+            airport = queue.popleft()
+            edges = range(self.offsets[airport], self.offsets[airport + 1])
+            for edge in edges:
+                target = self.targets[edge]
+                if not visited[target]:
+                    visited[target] = 1
+                    through[target] = edge
+                    queue.append(target)
+
+        return through
+
+    def _path(self, source, destination, through):
+        edges = []
+        airport = destination
+        while airport != source:
+            edge = through[airport]
+            if edge == UNREACHABLE:
+                return None
+            edges.append(edge)
+            airport = self.sources[edge]
+        edges.reverse()
+
+        return {
+            "airports": [self.airport_ids[source]]
+            + [self.airport_ids[self.targets[edge]] for edge in edges],
+            "routes": [self.route_ids[edge] for edge in edges],
+            "distance": sum(self.distances[edge] for edge in edges),
+            "hops": len(edges),
+        }
+
+    def shortest_distance(self, source_id, destination_id):
+        """Returns the path with the smallest total distance or None"""
+        if source_id not in self.index or destination_id not in self.index:
+            return None
+
+        source = self.index[source_id]
+        _, through = self.distance_tree(source)
+        return self._path(source, self.index[destination_id], through)
+
+    def fewest_hops(self, source_id, destination_id):
+        """Returns the path with the fewest routes or None"""
+        if source_id not in self.index or destination_id not in self.index:
+            return None
+
+        source = self.index[source_id]
+        return self._path(
+            source, self.index[destination_id], self.hops_tree(source)
+        )
+
+
+class RouteGraphCache:
+    """Lazily built RouteGraph refreshed every ``refresh_interval`` seconds.
+
+    ``invalidate()`` increments a version shared through the cache once
+    the transaction commits, so every process rebuilds on its next query.
+    """
+
+    version_key = VERSION_KEY.format("route_graph")
+
+    def __init__(self, refresh_interval=300):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._graph = None
+        self._version = None
+        self._loaded_at = 0
+
+    def invalidate(self, using=None):
+        transaction.on_commit(
+            lambda: increment_version(self.version_key), using=using
+        )
+
+    def _is_fresh(self, version):
+        return (
+            self._graph is not None
+            and self._version == version
+            and time.monotonic() - self._loaded_at < self.refresh_interval
+        )
+
+    def get(self):
+        version = get_version(self.version_key)
+        if self._is_fresh(version):
+            return self._graph
+
+        with self._lock:
+            # Another thread may have rebuilt it while this one waited.
+            if not self._is_fresh(version):
+                self._graph = RouteGraph.from_database()
+                self._version = version
+                self._loaded_at = time.monotonic()
+            return self._graph
+
+
+route_graph = RouteGraphCache()
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from airport.imports import existing_flight_ids, flight_key, insert_flights
+from airport.models import Crew, Flight, FlightSchedule
+from airport.signals import notify_bulk_create
+from airport.utils import batched
+
+
+HORIZON = timedelta(days=90)
+
+
+def pending_flights(schedules, today, until):
+    """Yields (flight, crew ids) of schedule days not materialized yet"""
+    for schedule in schedules:
+        start = today
+        if schedule.expanded_until is not None:
+            start = max(start, schedule.expanded_until + timedelta(days=1))
+
+        crew_ids = [crew.pk for crew in schedule.crews.all()]
+        for flight in schedule.flights(start, until):
+            yield flight, crew_ids
+
+
+def expand_schedules(
+    schedules=None, horizon=HORIZON, today=None, batch_size=1000
+):
+    """Materializes flights of schedules up to ``horizon`` from today.
+
+    Every schedule remembers how far it was expanded, so a daily run only
+    writes the day that entered the horizon. Flights that already exist
+    are left as they are. Returns the number of flights created.
+    """
+    today = today or timezone.localdate()
+    until = today + horizon
+    if schedules is None:
+        schedules = FlightSchedule.objects.all()
+
+    schedules = list(
+        schedules.filter(valid_from__lte=until, valid_until__gte=today)
+        .filter(Q(expanded_until__isnull=True) | Q(expanded_until__lt=until))
+        .prefetch_related("crews")
+    )
+    created = sum(
+        insert_flights(batch)
+        for batch in batched(
+            pending_flights(schedules, today, until), batch_size
+        )
+    )
+    FlightSchedule.objects.filter(
+        pk__in=[schedule.pk for schedule in schedules]
+    ).update(expanded_until=until)
+
+    if created:
+        notify_bulk_create(Flight)
+        notify_bulk_create(Crew)
+    return created
+
+
+def retract_schedule(schedule, today=None):
+    """Deletes unbooked flights the schedule created from today on.
+
+    Flights do not reference their schedule, so they are matched on the
+    route, airplane and times the schedule gave them. Flights with tickets
+    are kept. Returns the number of flights deleted.
+    """
+    today = today or timezone.localdate()
+    if schedule.expanded_until is None or schedule.expanded_until < today:
+        return 0
+
+    flights = schedule.flights(today, schedule.expanded_until)
+    if not flights:
+        return 0
+
+    keys = {flight_key(flight) for flight in flights}
+    deleted, counts = Flight.objects.filter(
+        pk__in=[
+            flight_id
+            for key, flight_id in existing_flight_ids(flights).items()
+            if key in keys
+        ],
+        departure_time__gt=timezone.now(),
+        tickets__isnull=True,
+    ).delete()
+    return counts.get(Flight._meta.label, 0)
@@ -0,0 +1,115 @@
+import base64
+
+from django.db import NotSupportedError
+from django.db.models import BinaryField, Func
+
+
+class SeatMap:
+    """Occupancy bitset of a flight, one bit per seat in row-major order"""
+
+    def __init__(self, rows, seats_in_row, data=b""):
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        size = (rows * seats_in_row + 7) // 8
+        self.bits = bytearray(bytes(data)[:size].ljust(size, b"\0"))
+
+    def __contains__(self, place):
+        row, seat = place
+        return 1 <= row <= self.rows and 1 <= seat <= self.seats_in_row
+
+    def index(self, row, seat):
+        """Position of the seat bit, counted from the lowest of byte 0"""
+        if (row, seat) not in self:
+            raise ValueError(f"Seat {row}/{seat} is out of the seat map")
+
+        return (row - 1) * self.seats_in_row + seat - 1
+
+    def _position(self, row, seat):
+        index = self.index(row, seat)
+        return index >> 3, 1 << (index & 7)
+
+    def is_taken(self, row, seat):
+        byte, mask = self._position(row, seat)
+        return bool(self.bits[byte] & mask)
+
+    def occupy(self, row, seat):
+        byte, mask = self._position(row, seat)
+        self.bits[byte] |= mask
+
+    def release(self, row, seat):
+        byte, mask = self._position(row, seat)
+        self.bits[byte] &= ~mask
+
+    def taken_places(self):
+        """Yields (row, seat) pairs of taken seats in row-major order"""
+        for byte_index, byte in enumerate(self.bits):
+            while byte:
+                lowest = byte & -byte
+                index = byte_index * 8 + lowest.bit_length() - 1
+                row, seat = divmod(index, self.seats_in_row)
+                yield row + 1, seat + 1
+                byte ^= lowest
+
+    def to_bytes(self):
+        return bytes(self.bits)
+
+    def to_base64(self):
+        return base64.b64encode(self.bits).decode("ascii")
+
+
+def set_bits(data, size, value, indexes):
+    """Pure Python twin of SetSeatBits, registered as an SQLite function"""
+    bits = bytearray(bytes(data or b"")[:size].ljust(size, b"\0"))
+    for index in map(int, indexes.split(",")):
+        if value:
+            bits[index >> 3] |= 1 << (index & 7)
+        else:
+            bits[index >> 3] &= ~(1 << (index & 7))
+    return bytes(bits)
+
+
+class SetSeatBits(Func):
+    """Seat map column with some bits set or cleared by the database.
+
+    Used as an UPDATE value, so a booking changes the stored map without
+    reading it first and holding a row lock while Python patches it. The
+    map is padded with zeros to ``size`` bytes, as SeatMap does.
+    """
+
+    output_field = BinaryField()
+
+    def __init__(self, expression, size, indexes, value=True):
+        super().__init__(expression)
+        self.size = size
+        self.indexes = sorted(indexes)
+        self.value = int(value)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        # set_bit() numbers bits from the lowest of each byte, like SeatMap.
+        sql = (
+            f"({sql} || decode(repeat('00', "
+            f"greatest(%s - octet_length({sql}), 0)), 'hex'))"
+        )
+        params = [*params, self.size, *params]
+        for index in self.indexes:
+            sql = f"set_bit({sql}, %s, %s)"
+            params += [index, self.value]
+        return sql, params
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"airport_set_bits({sql}, %s, %s, %s)",
+            [
+                *params,
+                self.size,
+                self.value,
+                ",".join(map(str, self.indexes)),
+            ],
+        )
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f"Seat maps can not be updated in place on {connection.vendor}."
+        )
@@ -1,7 +1,16 @@
-from django.db import transaction
+from collections import defaultdict
+from collections.abc import Mapping
+from django.db import IntegrityError, transaction
+from django.db.models import Q, prefetch_related_objects
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import ErrorDetail, ValidationError
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator
 
+from airport.exceptions import SeatsAlreadyTaken
+from airport.images import LIST_VARIANT, image_url
 from airport.models import (
     Airport,
     Crew,
@@ -12,6 +21,211 @@ from airport.models import (
     Flight,
     Ticket,
 )
+from airport.utils import batched
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Resolves primary keys from objects batch loaded by the root serializer.
+
+    The root serializer puts ``{pk: instance}`` dicts per model into
+    ``context["prefetched"]``; without them the field queries as usual.
+    """
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get("prefetched", {}).get(
+            self.queryset.model
+        )
+        if prefetched is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return prefetched[int(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+def collect_pks(items, field_name):
+    """Collects integer primary keys referenced by a list of raw items"""
+    pks = set()
+    if not isinstance(items, list):
+        return pks
+
+    for item in items:
+        if not isinstance(item, Mapping):
+            continue
+        values = item.get(field_name)
+        for value in values if isinstance(values, list) else [values]:
+            try:
+                pks.add(int(value))
+            except (TypeError, ValueError):
+                pass
+
+    return pks
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """Validates and creates a list of model objects with batched queries.
+
+    Related objects are loaded with one query per model for all items,
+    unique_together is checked for a batch of items at once, and objects
+    with their many-to-many rows are written with bulk inserts. With
+    ``context["partial_success"]`` invalid items are left out, and their
+    errors kept in ``failures`` by index, instead of failing the list.
+    """
+
+    batch_size = 1000
+
+    def prefetch_related(self, data):
+        querysets = {}
+        pks_by_model = defaultdict(set)
+        for field in self.child.fields.values():
+            relation = getattr(field, "child_relation", field)
+            if field.read_only or not isinstance(
+                relation, PrefetchedPrimaryKeyRelatedField
+            ):
+                continue
+            model = relation.queryset.model
+            querysets.setdefault(model, relation.queryset)
+            pks_by_model[model] |= collect_pks(data, field.field_name)
+
+        prefetched = self.context.setdefault("prefetched", {})
+        for model, pks in pks_by_model.items():
+            prefetched[model] = querysets[model].in_bulk(pks)
+
+    def check_unique_together(self, validated, validators):
+        """Returns errors by index of items that break unique_together"""
+        errors = {}
+        for validator in validators:
+            sources = [
+                self.child.fields[field].source for field in validator.fields
+            ]
+            keys = [
+                (
+                    index,
+                    tuple(
+                        getattr(attrs[source], "pk", attrs[source])
+                        for source in sources
+                    ),
+                )
+                for index, attrs in validated.items()
+                if index not in errors
+                and all(source in attrs for source in sources)
+            ]
+            message = validator.message.format(
+                field_names=", ".join(validator.fields)
+            )
+
+            seen = set()
+            for batch in batched(keys, self.batch_size):
+                # Matching every field with IN may over-fetch a little; the
+                # exact keys are compared below.
+                existing = set(
+                    validator.queryset.filter(
+                        **{
+                            f"{source}__in": {key[i] for _, key in batch}
+                            for i, source in enumerate(sources)
+                        }
+                    ).values_list(*sources)
+                )
+                for index, key in batch:
+                    if key in existing or key in seen:
+                        errors[index] = {
+                            api_settings.NON_FIELD_ERRORS_KEY: [
+                                ErrorDetail(message, code="unique")
+                            ]
+                        }
+                    seen.add(key)
+
+        return errors
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or (
+            self.max_length is not None and len(data) > self.max_length
+        ):
+            return super().to_internal_value(data)
+
+        self.prefetch_related(data)
+        validators = self.child.validators
+        unique_together = [
+            validator for validator in validators
+            if isinstance(validator, UniqueTogetherValidator)
+        ]
+        self.child.validators = [
+            validator for validator in validators
+            if validator not in unique_together
+        ]
+
+        validated = {}
+        self.failures = {}
+        for index, item in enumerate(data):
+            try:
+                validated[index] = self.child.run_validation(item)
+            except ValidationError as exc:
+                self.failures[index] = exc.detail
+        self.failures.update(
+            self.check_unique_together(validated, unique_together)
+        )
+
+        if self.failures and not self.context.get("partial_success"):
+            raise ValidationError(
+                [self.failures.get(index, {}) for index in range(len(data))]
+            )
+        return [
+            attrs for index, attrs in validated.items()
+            if index not in self.failures
+        ]
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        m2m_fields = [
+            field for field in model._meta.many_to_many
+            if any(field.name in attrs for attrs in validated_data)
+        ]
+        m2m_names = {field.name for field in m2m_fields}
+        instances = [
+            model(
+                **{
+                    name: value for name, value in attrs.items()
+                    if name not in m2m_names
+                }
+            )
+            for attrs in validated_data
+        ]
+
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    instances, batch_size=self.batch_size
+                )
+                for field in m2m_fields:
+                    through = field.remote_field.through
+                    source = through._meta.get_field(
+                        field.m2m_field_name()
+                    ).attname
+                    target = through._meta.get_field(
+                        field.m2m_reverse_field_name()
+                    ).attname
+                    through.objects.bulk_create(
+                        [
+                            through(**{source: instance.pk, target: obj.pk})
+                            for instance, attrs in zip(
+                                instances, validated_data
+                            )
+                            for obj in dict.fromkeys(attrs.get(field.name, ()))
+                        ],
+                        batch_size=self.batch_size,
+                    )
+        except IntegrityError:
+            raise ValidationError(
+                "Some of the objects were created meanwhile, try again."
+            )
+
+        prefetch_related_objects(instances, *m2m_names)
+        return instances
 
 
 class AirportSerializer(serializers.ModelSerializer):
@@ -24,11 +238,25 @@ class AirportSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "country", "closest_big_city",)
 
 
+@extend_schema_field(OpenApiTypes.URI)
+class ImageVariantField(serializers.Field):
+    """URL of a resized variant of an image, the original until it exists"""
+
+    def __init__(self, variant=LIST_VARIANT, **kwargs):
+        self.variant = variant
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        return image_url(instance, self.variant, self.context.get("request"))
+
+
 class AirportListSerializer(AirportSerializer):
     closest_big_city = serializers.SlugRelatedField(
         many=False, slug_field="name", read_only=True
     )
     routes_count = serializers.IntegerField(read_only=True)
+    image = ImageVariantField(source="*")
 
     class Meta:
         model = Airport
@@ -48,6 +276,7 @@ class CrewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Crew
         fields = ("id", "first_name", "last_name", "flight_count",)
+        list_serializer_class = BulkCreateListSerializer
 
 
 class AirplaneTypeSerializer(serializers.ModelSerializer):
@@ -57,9 +286,12 @@ class AirplaneTypeSerializer(serializers.ModelSerializer):
 
 
 class RouteSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     class Meta:
         model = Route
         fields = ("id", "source", "destination", "distance",)
+        list_serializer_class = BulkCreateListSerializer
 
 
 class RouteListSerializer(RouteSerializer):
@@ -67,6 +299,29 @@ class RouteListSerializer(RouteSerializer):
     destination = AirportSerializer(many=False, read_only=True)
 
 
+class RoutePathSearchSerializer(serializers.Serializer):
+    source = serializers.IntegerField(help_text="Id of the start airport.")
+    destination = serializers.IntegerField(
+        help_text="Id of the end airport."
+    )
+
+
+class RoutePathSerializer(serializers.Serializer):
+    airports = serializers.ListField(
+        child=serializers.IntegerField(), read_only=True
+    )
+    routes = serializers.ListField(
+        child=serializers.IntegerField(), read_only=True
+    )
+    distance = serializers.IntegerField(read_only=True)
+    hops = serializers.IntegerField(read_only=True)
+
+
+class RoutePathsSerializer(serializers.Serializer):
+    shortest_distance = RoutePathSerializer(read_only=True, allow_null=True)
+    fewest_hops = RoutePathSerializer(read_only=True, allow_null=True)
+
+
 class AirportRouteSerializer(RouteSerializer):
     source = AirportSerializer(many=False, read_only=True)
     destination = serializers.CharField(read_only=True)
@@ -123,6 +378,8 @@ class AirplaneSerializer(serializers.ModelSerializer):
 
 
 class FlightSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     class Meta:
         model = Flight
         fields = (
@@ -133,6 +390,26 @@ class FlightSerializer(serializers.ModelSerializer):
             "arrival_time",
             "crews",
         )
+        list_serializer_class = BulkCreateListSerializer
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            airplane_changed = (
+                "airplane" in validated_data
+                and validated_data["airplane"] != instance.airplane
+            )
+            if airplane_changed:
+                # Bookings update the flight row, so it is locked first.
+                Flight.objects.select_for_update().get(pk=instance.pk)
+                Flight.validate_airplane(
+                    instance.pk, validated_data["airplane"], ValidationError
+                )
+            flight = super().update(instance, validated_data)
+            if airplane_changed and flight.rebuild_seat_inventory():
+                flight.save(
+                    update_fields=["seat_map", "seats_sold", "updated_at"]
+                )
+            return flight
 
 
 class FlightListSerializer(FlightSerializer):
@@ -140,11 +417,11 @@ class FlightListSerializer(FlightSerializer):
         source="airplane.name",
         read_only=True
     )
-    tickets_available = serializers.IntegerField(read_only=True)
-    airplane_image = serializers.ImageField(
-        source="airplane.image",
+    tickets_available = serializers.IntegerField(
+        source="seats_available",
         read_only=True
     )
+    airplane_image = ImageVariantField(source="airplane")
 
     class Meta:
         model = Flight
@@ -158,6 +435,75 @@ class FlightListSerializer(FlightSerializer):
         )
 
 
+class FlightLegSerializer(FlightListSerializer):
+    source = serializers.CharField(source="route.source.name", read_only=True)
+    destination = serializers.CharField(
+        source="route.destination.name", read_only=True
+    )
+
+    class Meta:
+        model = Flight
+        fields = (
+            "id",
+            "source",
+            "destination",
+            "departure_time",
+            "arrival_time",
+            "airplane_name",
+            "tickets_available",
+        )
+
+
+class ItinerarySerializer(serializers.Serializer):
+    departure_time = serializers.DateTimeField(read_only=True)
+    arrival_time = serializers.DateTimeField(read_only=True)
+    stops = serializers.IntegerField(read_only=True)
+    legs = FlightLegSerializer(many=True, read_only=True)
+
+
+class ItinerarySearchSerializer(serializers.Serializer):
+    source = serializers.IntegerField(
+        required=False, help_text="Id of the departure airport."
+    )
+    source_city = serializers.CharField(
+        required=False, help_text="Name of the departure city."
+    )
+    destination = serializers.IntegerField(
+        required=False, help_text="Id of the arrival airport."
+    )
+    destination_city = serializers.CharField(
+        required=False, help_text="Name of the arrival city."
+    )
+    date = serializers.DateField(help_text="Departure date of the first leg.")
+    max_stops = serializers.IntegerField(min_value=0, max_value=2, default=2)
+    min_connection = serializers.IntegerField(
+        min_value=0,
+        default=60,
+        help_text="Minimal time between connecting flights in minutes.",
+    )
+
+    def validate(self, attrs):
+        for point in ("source", "destination"):
+            if point not in attrs and f"{point}_city" not in attrs:
+                raise ValidationError(
+                    {point: f"Either {point} or {point}_city is required."}
+                )
+
+        return attrs
+
+
+class TicketExportSerializer(serializers.Serializer):
+    export_format = serializers.ChoiceField(
+        choices=("csv", "ndjson"), default="csv"
+    )
+    created_from = serializers.DateField(
+        required=False, help_text="Export orders created on or after it."
+    )
+    created_to = serializers.DateField(
+        required=False, help_text="Export orders created on or before it."
+    )
+
+
 class CrewDetailSerializer(CrewSerializer):
     flights = FlightSerializer(many=True, read_only=True)
 
@@ -167,6 +513,8 @@ class CrewDetailSerializer(CrewSerializer):
 
 
 class TicketSerializer(serializers.ModelSerializer):
+    flight = PrefetchedPrimaryKeyRelatedField(queryset=Flight.objects.all())
+
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
         Ticket.validate_ticket(
@@ -180,6 +528,8 @@ class TicketSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ticket
         fields = ("id", "row", "seat", "flight",)
+        # Taken seats are detected by the unique index on insert.
+        validators = []
 
 
 class TicketListSerializer(TicketSerializer):
@@ -197,9 +547,7 @@ class FlightDetailSerializer(FlightSerializer):
         many=False,
         read_only=True
     )
-    taken_places = TicketSeatsSerializer(
-        source="tickets", many=True, read_only=True
-    )
+    taken_places = serializers.SerializerMethodField()
     route = RouteSerializer(
         many=False, read_only=True
     )
@@ -215,6 +563,36 @@ class FlightDetailSerializer(FlightSerializer):
             "taken_places",
         )
 
+    @extend_schema_field(TicketSeatsSerializer(many=True))
+    def get_taken_places(self, flight):
+        return [
+            {"row": row, "seat": seat}
+            for row, seat in flight.get_seat_map().taken_places()
+        ]
+
+
+class SeatMapSerializer(serializers.Serializer):
+    rows = serializers.IntegerField(read_only=True)
+    seats_in_row = serializers.IntegerField(read_only=True)
+    bitmap = serializers.CharField(source="to_base64", read_only=True)
+
+
+class FlightSeatMapDetailSerializer(FlightDetailSerializer):
+    seat_map = SeatMapSerializer(
+        source="get_seat_map", many=False, read_only=True
+    )
+
+    class Meta:
+        model = Flight
+        fields = (
+            "id",
+            "departure_time",
+            "arrival_time",
+            "airplane",
+            "route",
+            "seat_map",
+        )
+
 
 class OrderSerializer(serializers.ModelSerializer):
     tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
@@ -223,13 +601,69 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ("id", "tickets", "created_at")
 
+    def to_internal_value(self, data):
+        if isinstance(data, Mapping):
+            flight_ids = collect_pks(data.get("tickets"), "flight")
+            self.context.setdefault("prefetched", {})[Flight] = (
+                Flight.objects.select_related("airplane").in_bulk(flight_ids)
+            )
+
+        return super().to_internal_value(data)
+
+    def validate_tickets(self, tickets):
+        places = [
+            (ticket["flight"].pk, ticket["row"], ticket["seat"])
+            for ticket in tickets
+        ]
+        if len(set(places)) != len(places):
+            raise ValidationError("The same seat is ordered more than once.")
+
+        return tickets
+
     def create(self, validated_data):
-        with transaction.atomic():
-            tickets_data = validated_data.pop("tickets")
-            order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
-            return order
+        tickets_data = validated_data.pop("tickets")
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(**validated_data)
+                Ticket.bulk_book(
+                    [
+                        Ticket(order=order, **ticket_data)
+                        for ticket_data in tickets_data
+                    ],
+                    ValidationError,
+                )
+
+                places_by_flight = defaultdict(list)
+                for ticket_data in tickets_data:
+                    places_by_flight[ticket_data["flight"].pk].append(
+                        (ticket_data["row"], ticket_data["seat"])
+                    )
+                Flight.update_seat_inventory(places_by_flight)
+                return order
+        except IntegrityError:
+            # Only the unique seat index is a conflict with another order;
+            # any other integrity error is a bug and stays a server error.
+            taken_seats = self.get_taken_seats(tickets_data)
+            if not taken_seats:
+                raise
+            raise SeatsAlreadyTaken(taken_seats)
+
+    @staticmethod
+    def get_taken_seats(tickets_data):
+        """Returns which of the requested seats are sold already"""
+        query = Q()
+        for ticket_data in tickets_data:
+            query |= Q(
+                flight=ticket_data["flight"],
+                row=ticket_data["row"],
+                seat=ticket_data["seat"],
+            )
+
+        return list(
+            Ticket.objects.filter(query)
+            .order_by("flight", "row", "seat")
+            .values("flight", "row", "seat")
+        )
 
 
 class OrderListSerializer(OrderSerializer):
@@ -0,0 +1,114 @@
+import time
+
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from airport.cache import bump_model_version
+from airport.images import schedule_variants
+from airport.itineraries import flight_index
+from airport.models import Airplane, Airport, Flight, Route
+from airport.routing import route_graph
+from airport.seat_map import set_bits
+
+
+# Seat sales rewrite these on every order; they do not affect schedules.
+INVENTORY_FIELDS = {"seat_map", "seats_sold", "updated_at"}
+
+# Seconds a kept database connection may idle and be reused unpinged.
+HEALTH_CHECK_INTERVAL = 10
+
+
+@receiver(post_save, sender=Airport)
+@receiver(post_save, sender=Route)
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Airport)
+@receiver(post_delete, sender=Route)
+@receiver(post_delete, sender=Flight)
+def invalidate_flight_index(sender, update_fields=None, using=None, **kwargs):
+    if update_fields and set(update_fields) <= INVENTORY_FIELDS:
+        return
+
+    flight_index.invalidate(using)
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def invalidate_route_graph(sender, using=None, **kwargs):
+    route_graph.invalidate(using)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_cache_version(sender, using=None, **kwargs):
+    if sender._meta.app_label == "airport":
+        bump_model_version(sender, using)
+
+
+@receiver(m2m_changed)
+def bump_related_cache_versions(
+    sender, instance, model, action, using=None, **kwargs
+):
+    if action.startswith("post_") and sender._meta.app_label == "airport":
+        bump_model_version(type(instance), using)
+        bump_model_version(model, using)
+
+
+@receiver(post_save, sender=Airport)
+@receiver(post_save, sender=Airplane)
+def generate_image_variants(sender, instance, **kwargs):
+    if (
+        instance.image
+        and instance.image_variants.get("source") != instance.image.name
+    ):
+        schedule_variants(instance)
+
+
+def notify_bulk_create(model, using=None):
+    """Does what the receivers above do on save for bulk created rows"""
+    if model in (Airport, Route, Flight):
+        flight_index.invalidate(using)
+    if model is Route:
+        route_graph.invalidate(using)
+    bump_model_version(model, using)
+
+
+@receiver(connection_created)
+def register_sqlite_functions(sender, connection, **kwargs):
+    """Gives SQLite the bit functions SetSeatBits uses on PostgreSQL"""
+    if connection.vendor == "sqlite":
+        connection.connection.create_function(
+            "airport_set_bits", 4, set_bits, deterministic=True
+        )
+
+
+@receiver(connection_created)
+def start_connection_clock(sender, connection, **kwargs):
+    connection.known_usable_at = time.monotonic()
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    """Drops kept database connections the server side has closed.
+
+    Django 4.0 has no CONN_HEALTH_CHECKS, so a connection kept open by
+    CONN_MAX_AGE is pinged before a request reuses it. Only connections
+    idle for HEALTH_CHECK_INTERVAL seconds are pinged; under steady
+    traffic requests reuse them without a round trip.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if (
+            connection.connection is None
+            or connection.settings_dict["CONN_MAX_AGE"] == 0
+            or connection.in_atomic_block
+        ):
+            continue
+
+        idle = now - getattr(connection, "known_usable_at", 0)
+        if idle < HEALTH_CHECK_INTERVAL or connection.is_usable():
+            connection.known_usable_at = now
+        else:
+            connection.close()
@@ -4,9 +4,20 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from airport.models import Airplane, AirplaneType
+from airport.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    City,
+    Country,
+    Flight,
+    Order,
+    Route,
+    Ticket,
+)
 from airport.serializers import AirplaneSerializer
 from config.settings import BASE_DIR
 
@@ -16,6 +27,7 @@ AIRPLANE_URL = reverse("airport:airplane-list")
 def upload_image_url(airplane_id: int) -> str:
     return reverse("airport:airplane-upload-image", args=[airplane_id])
 
+
 def sample_airplane(**params):
     airplane_type = AirplaneType.objects.create(
         name="Test Type"
@@ -30,6 +42,30 @@ def sample_airplane(**params):
 
     return Airplane.objects.create(**defaults)
 
+def sample_booked_flight(airplane, user, places):
+    city = City.objects.create(
+        name="Test City", country=Country.objects.create(name="Test Country")
+    )
+    route = Route.objects.create(
+        source=Airport.objects.create(name="Airport 1", closest_big_city=city),
+        destination=Airport.objects.create(
+            name="Airport 2", closest_big_city=city
+        ),
+        distance=100,
+    )
+    flight = Flight.objects.create(
+        route=route,
+        airplane=airplane,
+        departure_time="2030-01-01T10:00:00Z",
+        arrival_time="2030-01-01T12:00:00Z",
+    )
+    order = Order.objects.create(user=user)
+    for row, seat in places:
+        Ticket.objects.create(row=row, seat=seat, flight=flight, order=order)
+    Flight.rebuild_seat_inventories([flight.pk])
+    flight.refresh_from_db()
+    return flight
+
 
 class UnauthenticatedAirplaneApiTests(TestCase):
     def setUp(self):
@@ -141,3 +177,26 @@ class AdminAirplaneApiTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsNotNone(airplane.image)
+
+    def test_change_airplane_layout_rebuilds_seat_maps(self):
+        airplane = sample_airplane()
+        flight = sample_booked_flight(airplane, self.user, [(2, 3), (5, 1)])
+
+        airplane.seats_in_row = 4
+        airplane.full_clean()
+        airplane.save()
+        flight.refresh_from_db()
+
+        self.assertEqual(flight.seats_available, 38)
+        self.assertEqual(len(flight.seat_map), 5)
+        self.assertEqual(
+            list(flight.get_seat_map().taken_places()), [(2, 3), (5, 1)]
+        )
+
+    def test_change_airplane_layout_leaving_out_sold_seats(self):
+        airplane = sample_airplane()
+        sample_booked_flight(airplane, self.user, [(9, 7)])
+
+        airplane.rows = 8
+        with self.assertRaises(ValidationError):
+            airplane.full_clean()
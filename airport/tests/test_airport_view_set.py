@@ -1,11 +1,23 @@
+import hashlib
 import os
-from django.test import TestCase
+import tempfile
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 
+from airport.cache import get_model_versions
+from airport import images
+from airport.images import generate_variants, missing_variants
+from airport.media import serve_media
 from airport.models import Country, City, Airport, Route
 from airport.serializers import AirportDetailSerializer
 from config.settings import BASE_DIR
@@ -47,6 +59,7 @@ class UnauthenticatedAirportApiTests(TestCase):
 
 class AuthenticatedAirportApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             "test@test.com",
@@ -60,6 +73,95 @@ class AuthenticatedAirportApiTests(TestCase):
         response = self.client.get(AIRPORT_URL)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
+    def test_list_airport_sees_new_airports(self):
+        sample_airport()
+        response1 = self.client.get(AIRPORT_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_airport()
+        response2 = self.client.get(AIRPORT_URL)
+
+        self.assertEqual(len(response1.data), 1)
+        self.assertEqual(len(response2.data), 2)
+
+    def test_list_airport_cached(self):
+        sample_airport()
+        self.client.get(AIRPORT_URL)
+
+        with self.assertNumQueries(0):
+            response1 = self.client.get(AIRPORT_URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_airport()
+        response2 = self.client.get(AIRPORT_URL)
+
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response1.data), 1)
+        self.assertEqual(len(response2.data), 2)
+
+    def test_list_airport_cache_version_bumped_on_commit(self):
+        versions = get_model_versions([Airport])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            sample_airport()
+        versions_before_commit = get_model_versions([Airport])
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(versions_before_commit, versions)
+        self.assertNotEqual(get_model_versions([Airport]), versions)
+
+    def test_list_airport_cache_key_includes_filters(self):
+        airport = sample_airport()
+        sample_airport()
+        self.client.get(AIRPORT_URL)
+
+        response = self.client.get(
+            AIRPORT_URL, {"dep_cities": airport.closest_big_city.name}
+        )
+
+        self.assertEqual(len(response.data), 1)
+
+    def test_list_airport_not_modified(self):
+        sample_airport()
+        etag = self.client.get(AIRPORT_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            response1 = self.client.get(AIRPORT_URL, HTTP_IF_NONE_MATCH=etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_airport()
+        response2 = self.client.get(AIRPORT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response1.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response1["ETag"], etag)
+        self.assertEqual(response2.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response2["ETag"], etag)
+
+    def test_list_airport_validators_change_on_commit(self):
+        sample_airport()
+        etag = self.client.get(AIRPORT_URL)["ETag"]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            sample_airport()
+        response1 = self.client.get(AIRPORT_URL, HTTP_IF_NONE_MATCH=etag)
+        for callback in callbacks:
+            callback()
+        response2 = self.client.get(AIRPORT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response1.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response1["ETag"], etag)
+        self.assertEqual(response2.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response2["ETag"], etag)
+        self.assertEqual(len(response2.data), 2)
+
+    def test_list_airport_not_modified_since(self):
+        sample_airport()
+        last_modified = self.client.get(AIRPORT_URL)["Last-Modified"]
+
+        response = self.client.get(
+            AIRPORT_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_airport_filter(self):
         city1 = City.objects.create(
             name="City1",
@@ -98,6 +200,27 @@ class AuthenticatedAirportApiTests(TestCase):
         self.assertEqual(len(response3.data), 1)
         self.assertEqual(len(response4.data), 1)
 
+    def test_airport_filter_keeps_routes_count(self):
+        airport1 = sample_airport()
+        airport2 = sample_airport()
+        airport3 = sample_airport(closest_big_city=airport2.closest_big_city)
+        for destination in (airport2, airport3):
+            Route.objects.create(
+                source=airport1, destination=destination, distance=100
+            )
+        Route.objects.create(source=airport2, destination=airport1, distance=100)
+        Route.objects.create(source=airport3, destination=airport1, distance=100)
+
+        response = self.client.get(
+            AIRPORT_URL,
+            {"dest_countries": airport2.closest_big_city.country.name},
+        )
+
+        self.assertEqual(
+            [airport["id"] for airport in response.data], [airport1.pk]
+        )
+        self.assertEqual(response.data[0]["routes_count"], 2)
+
     def test_retrieve_airport_detail(self):
         city1 = City.objects.create(
             name="City1",
@@ -169,6 +292,7 @@ class AuthenticatedAirportApiTests(TestCase):
 
 class AdminAirportApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             "test@test.com",
@@ -214,3 +338,154 @@ class AdminAirportApiTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsNotNone(airport.image)
+
+    def test_airport_upload_image_schedules_variants(self):
+        airport = sample_airport()
+        with open(
+            os.path.join(BASE_DIR, "media", "test_image.jpg"), "rb"
+        ) as file:
+            payload = {"image": file}
+
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(upload_image_url(airport.pk), payload)
+        airport.refresh_from_db()
+        scheduled = [
+            callback for callback in callbacks
+            if callback.__module__ == "airport.images"
+        ]
+
+        self.assertEqual(len(scheduled), 1)
+        self.assertEqual(airport.image_variants, {})
+
+    def test_list_airport_returns_small_variant(self):
+        airport = sample_airport()
+        with open(
+            os.path.join(BASE_DIR, "media", "test_image.jpg"), "rb"
+        ) as file:
+            self.client.post(upload_image_url(airport.pk), {"image": file})
+        airport.refresh_from_db()
+
+        before = self.client.get(AIRPORT_URL).data[0]["image"]
+        with self.captureOnCommitCallbacks(execute=True):
+            variants = generate_variants(
+                Airport, airport.pk, airport.image.name
+            )
+        after = self.client.get(AIRPORT_URL).data[0]["image"]
+
+        self.assertTrue(before.endswith(airport.image.url))
+        self.assertTrue(after.endswith(variants["small.webp"]))
+        self.assertEqual(
+            set(variants),
+            {"source", "small.webp", "small.jpeg", "medium.webp", "medium.jpeg"},
+        )
+        with airport.image.storage.open(variants["small.webp"]) as file:
+            self.assertLessEqual(max(Image.open(file).size), 320)
+
+    def test_generate_image_variants_backfills_missing(self):
+        airport = sample_airport()
+        with open(
+            os.path.join(BASE_DIR, "media", "test_image.jpg"), "rb"
+        ) as file:
+            self.client.post(upload_image_url(airport.pk), {"image": file})
+        airport.refresh_from_db()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "generate_image_variants", stdout=open(os.devnull, "w")
+            )
+        airport.refresh_from_db()
+
+        self.assertEqual(airport.image_variants["source"], airport.image.name)
+        self.assertEqual(missing_variants(Airport), [])
+
+    def test_failed_variants_are_logged(self):
+        airport = sample_airport()
+
+        # The test transaction must survive the pool thread cleanup.
+        with mock.patch.object(images.connections, "close_all"):
+            with self.assertLogs("airport.images", "ERROR") as logs:
+                images._run(Airport, airport.pk, "airports/missing.jpg")
+
+        self.assertIn(f"airport.Airport {airport.pk}", logs.output[0])
+
+
+class ContentAddressedMediaTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_files_named_by_content_and_stored_once(self):
+        name1 = default_storage.save(
+            "uploads/airports/a.JPG", ContentFile(b"image")
+        )
+        name2 = default_storage.save(
+            "uploads/airports/b.jpg", ContentFile(b"image")
+        )
+
+        self.assertEqual(name1, name2)
+        self.assertEqual(
+            name1,
+            f"uploads/airports/{hashlib.sha256(b'image').hexdigest()}.jpg",
+        )
+        self.assertEqual(
+            os.listdir(os.path.join(self.media_root.name, "uploads/airports")),
+            [os.path.basename(name1)],
+        )
+
+    @override_settings(DEBUG=True)
+    def test_media_served_as_immutable(self):
+        name = default_storage.save(
+            "uploads/airports/a.jpg", ContentFile(b"image")
+        )
+
+        # Called directly: with DEBUG on the debug toolbar would wrap the
+        # database cursors of the test client request.
+        response = serve_media(
+            RequestFactory().get(default_storage.url(name)), name
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), b"image")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+    def test_media_not_streamed_without_debug(self):
+        name = default_storage.save(
+            "uploads/airports/a.jpg", ContentFile(b"image")
+        )
+
+        response = self.client.get(default_storage.url(name))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT="/protected-media/")
+    def test_media_handed_to_web_server(self):
+        name = default_storage.save(
+            "uploads/airports/a.jpg", ContentFile(b"image")
+        )
+
+        response = self.client.get(default_storage.url(name))
+
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected-media/{name}"
+        )
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(response.content, b"")
+
+    @override_settings(MEDIA_ACCEL_REDIRECT="/protected-media/")
+    def test_missing_media_not_cached(self):
+        response = self.client.get("/media/uploads/airports/a.jpg")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("X-Accel-Redirect", response)
+        self.assertNotIn("immutable", response.get("Cache-Control", ""))
+
+    def test_media_path_outside_root_not_found(self):
+        response = self.client.get("/media/../config/settings.py")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
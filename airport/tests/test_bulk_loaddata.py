@@ -0,0 +1,42 @@
+import os
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from airport.models import Flight, Order, Ticket
+
+
+class BulkLoadDataTests(TestCase):
+    fixture = os.path.join(settings.BASE_DIR, "fixtures", "db_data.json")
+    excluded = ("-e", "contenttypes", "-e", "auth", "-e", "admin", "-e", "sessions")
+
+    def bulk_loaddata(self, *args):
+        call_command(
+            "bulk_loaddata", self.fixture, *self.excluded, *args,
+            stdout=open(os.devnull, "w"),
+        )
+
+    def test_bulk_loaddata(self):
+        self.bulk_loaddata("--batch-size", "2")
+        self.bulk_loaddata()
+
+        flight = Flight.objects.get(pk=4)
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(Ticket.objects.count(), 5)
+        self.assertEqual(Flight.crews.through.objects.count(), 7)
+        self.assertEqual(sorted(flight.crews.values_list("pk", flat=True)), [6, 8])
+        self.assertEqual(flight.seats_sold, 3)
+        self.assertTrue(flight.get_seat_map().is_taken(5, 2))
+
+    def test_bulk_loaddata_reconciles_seats_in_its_database(self):
+        with mock.patch.object(
+            Flight,
+            "rebuild_seat_inventories",
+            side_effect=Flight.rebuild_seat_inventories,
+        ) as rebuild:
+            self.bulk_loaddata("--database", "default")
+
+        self.assertTrue(rebuild.called)
+        for call in rebuild.call_args_list:
+            self.assertEqual(call.args[1], "default")
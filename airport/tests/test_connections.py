@@ -0,0 +1,33 @@
+from unittest import mock
+from django.db import connection
+from django.test import TestCase
+
+from airport import signals
+
+
+class PersistentConnectionCheckTests(TestCase):
+    def setUp(self):
+        connection.ensure_connection()
+        patcher = mock.patch.dict(connection.settings_dict, CONN_MAX_AGE=600)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def check(self, usable=True):
+        with mock.patch.object(
+            connection, "is_usable", return_value=usable
+        ) as is_usable, mock.patch.object(connection, "close") as close:
+            with mock.patch.object(connection, "in_atomic_block", False):
+                signals.check_persistent_connections()
+        return is_usable.call_count, close.call_count
+
+    def test_busy_connection_is_not_pinged(self):
+        connection.known_usable_at = signals.time.monotonic()
+
+        self.assertEqual(self.check(), (0, 0))
+
+    def test_idle_connection_is_pinged_and_closed_if_unusable(self):
+        connection.known_usable_at = (
+            signals.time.monotonic() - signals.HEALTH_CHECK_INTERVAL
+        )
+
+        self.assertEqual(self.check(usable=False), (1, 1))
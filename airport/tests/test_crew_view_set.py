@@ -97,6 +97,24 @@ class AuthenticatedCrewApiTests(TestCase):
 
         self.assertEqual(len(response.data), 1)
 
+    def test_crew_filter_keeps_flight_count(self):
+        flight = sample_flight()
+        other_flight = Flight.objects.create(
+            route=flight.route,
+            airplane=flight.airplane,
+            departure_time=timezone.now() + timezone.timedelta(days=1),
+            arrival_time=timezone.now() + timezone.timedelta(days=1),
+        )
+        crew = sample_crew()
+        crew.flights.add(flight, other_flight)
+
+        response = self.client.get(
+            CREW_URL, {"flights": f"{flight.pk},{other_flight.pk}"}
+        )
+
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["flight_count"], 2)
+
     def test_retrieve_crew_detail(self):
         flight = sample_flight()
         crew1 = sample_crew(first_name="Crew1")
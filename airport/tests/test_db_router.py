@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from airport.cache import model_modified_key
+from airport.models import Country, City, Airport, Route, Flight, AirplaneType, Airplane
+
+
+ORDER_URL = reverse("airport:order-list")
+
+
+def sample_flight():
+    city = City.objects.create(
+        name="Test City",
+        country=Country.objects.create(
+            name="Test Country"
+        )
+    )
+    airport1 = Airport.objects.create(
+        name="Test Airport 1",
+        closest_big_city=city,
+    )
+    airport2 = Airport.objects.create(
+        name="Test Airport 2",
+        closest_big_city=city,
+    )
+    route = Route.objects.create(
+        source=airport1,
+        destination=airport2,
+        distance=100
+    )
+    airplane = Airplane.objects.create(
+        name="Test Airplane",
+        rows=10,
+        seats_in_row=8,
+        airplane_type=AirplaneType.objects.create(
+            name="Test type"
+        )
+    )
+    return Flight.objects.create(
+        route=route,
+        airplane=airplane,
+        departure_time=timezone.now() + timezone.timedelta(days=2),
+        arrival_time=timezone.now(),
+    )
+
+
+@override_settings(REPLICA_LAG_SECONDS=60)
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.flight = sample_flight()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.flights_changed_long_ago()
+
+    def tearDown(self):
+        cache.clear()
+
+    @staticmethod
+    def flights_changed_long_ago():
+        for model in (Flight, Route, Airplane, AirplaneType):
+            cache.set(model_modified_key(model), 0, timeout=None)
+
+    def tables_read(self, url):
+        """Tables queried on the primary and the replica by a GET"""
+        replica = connections[settings.DATABASE_REPLICAS[0]]
+        with CaptureQueriesContext(connection) as primary_queries:
+            with CaptureQueriesContext(replica) as replica_queries:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return tuple(
+            "\n".join(query["sql"] for query in queries.captured_queries)
+            for queries in (primary_queries, replica_queries)
+        )
+
+    def test_airport_reads_go_to_replica(self):
+        primary, replica = self.tables_read(reverse("airport:flight-list"))
+
+        self.assertIn('FROM "airport_flight"', replica)
+        self.assertNotIn('FROM "airport_flight"', primary)
+
+    def test_order_reads_go_to_primary(self):
+        primary, replica = self.tables_read(ORDER_URL)
+
+        self.assertIn('FROM "airport_order"', primary)
+        self.assertEqual(replica, "")
+
+    def test_reads_after_own_write_stay_on_primary(self):
+        response = self.client.post(
+            ORDER_URL,
+            {"tickets": [{"row": 1, "seat": 1, "flight": self.flight.pk}]},
+            format="json",
+        )
+        self.flights_changed_long_ago()
+        primary, replica = self.tables_read(reverse("airport:flight-list"))
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("other@test.com", "pass")
+        )
+        _, other_replica = self.tables_read(reverse("airport:flight-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('FROM "airport_flight"', primary)
+        self.assertNotIn('FROM "airport_flight"', replica)
+        self.assertIn('FROM "airport_flight"', other_replica)
+
+    def test_recently_changed_data_is_read_from_primary(self):
+        cache.set(
+            model_modified_key(Flight),
+            timezone.now().timestamp(),
+            timeout=None,
+        )
+
+        primary, replica = self.tables_read(reverse("airport:flight-list"))
+
+        self.assertIn('FROM "airport_flight"', primary)
+        self.assertNotIn('FROM "airport_flight"', replica)
@@ -1,18 +1,29 @@
 import os
+import base64
 import datetime
 from django.utils import timezone
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 
 
-from airport.models import Country, City, Airport, Route, Flight, Route, AirplaneType, Airplane, Crew
+from airport.models import Country, City, Airport, Route, Flight, Route, AirplaneType, Airplane, Crew, FlightSchedule, Order, Ticket
+from airport.admin import FlightScheduleAdmin
+from airport.imports import insert_flights
+from airport.cache import get_version
+from airport.itineraries import FlightIndex
+from airport.schedules import expand_schedules
 from airport.serializers import FlightDetailSerializer
 
 
 FLIGHT_URL = reverse("airport:flight-list")
+SEARCH_URL = reverse("airport:flight-search")
 
 def detail_url(flight_id: int) -> str:
     return reverse("airport:flight-detail", args=[flight_id])
@@ -63,6 +74,43 @@ def sample_flights():
     )
 
 
+def sample_connection():
+    """Creates A -> B -> C flights connecting in B after 90 minutes"""
+    city = City.objects.create(
+        name="Test City",
+        country=Country.objects.create(name="Test Country"),
+    )
+    airports = [
+        Airport.objects.create(name=f"Airport {name}", closest_big_city=city)
+        for name in "AB"
+    ] + [
+        Airport.objects.create(
+            name="Airport C",
+            closest_big_city=City.objects.create(
+                name="Other City", country=city.country
+            ),
+        )
+    ]
+    airplane = Airplane.objects.create(name="Test Airplane", rows=10, seats_in_row=8)
+    day = timezone.localdate() + datetime.timedelta(days=1)
+    departure = timezone.make_aware(
+        datetime.datetime.combine(day, datetime.time(10))
+    )
+    first = Flight.objects.create(
+        route=Route.objects.create(source=airports[0], destination=airports[1], distance=100),
+        airplane=airplane,
+        departure_time=departure,
+        arrival_time=departure + datetime.timedelta(hours=1),
+    )
+    second = Flight.objects.create(
+        route=Route.objects.create(source=airports[1], destination=airports[2], distance=100),
+        airplane=airplane,
+        departure_time=departure + datetime.timedelta(hours=2, minutes=30),
+        arrival_time=departure + datetime.timedelta(hours=4),
+    )
+    return airports, day, first, second
+
+
 class UnauthenticatedFlightApiTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -74,6 +122,7 @@ class UnauthenticatedFlightApiTests(TestCase):
 
 class AuthenticatedFlightApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             "test@test.com",
@@ -98,8 +147,62 @@ class AuthenticatedFlightApiTests(TestCase):
         self.assertEqual(response1.status_code, status.HTTP_200_OK)
         self.assertEqual(response2.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(len(response1.data), 1)
-        self.assertEqual(len(response2.data), 1)
+        self.assertEqual(len(response1.data["results"]), 1)
+        self.assertEqual(len(response2.data["results"]), 1)
+
+    def test_flight_filter_date_range(self):
+        flight1, flight2 = sample_flights()
+        today = timezone.localdate(flight2.departure_time)
+
+        response1 = self.client.get(FLIGHT_URL, {
+            "date_from": (today + datetime.timedelta(days=1)).isoformat(),
+        })
+        response2 = self.client.get(FLIGHT_URL, {
+            "date_from": today.isoformat(),
+            "date_to": today.isoformat(),
+        })
+        response3 = self.client.get(FLIGHT_URL, {"date_to": "tomorrow"})
+
+        self.assertEqual(
+            [flight["id"] for flight in response1.data["results"]], [flight1.pk]
+        )
+        self.assertEqual(
+            [flight["id"] for flight in response2.data["results"]], [flight2.pk]
+        )
+        self.assertEqual(response3.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_flight_filter_invalid_route(self):
+        response = self.client.get(FLIGHT_URL, {"route": "abc"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("route", response.data)
+
+    def test_flight_filter_date_uses_range(self):
+        flight, _ = sample_flights()
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(FLIGHT_URL, {
+                "date": timezone.localdate(flight.departure_time).isoformat(),
+            })
+        sql = next(
+            query["sql"] for query in context.captured_queries
+            if query["sql"].startswith('SELECT "airport_flight"')
+        )
+
+        self.assertIn('"airport_flight"."departure_time" >=', sql)
+        self.assertIn('"airport_flight"."departure_time" <', sql)
+        self.assertNotIn("cast_date", sql)
+
+    def test_list_flight_cursor_pagination(self):
+        flight1, flight2 = sample_flights()
+
+        response1 = self.client.get(FLIGHT_URL, {"page_size": 1})
+        response2 = self.client.get(response1.data["next"])
+
+        self.assertEqual(response1.status_code, status.HTTP_200_OK)
+        self.assertEqual(response1.data["results"][0]["id"], flight2.pk)
+        self.assertEqual(response2.data["results"][0]["id"], flight1.pk)
+        self.assertIsNone(response2.data["next"])
 
     def test_retrieve_flight_detail(self):
         flight, _ = sample_flights()
@@ -112,6 +215,100 @@ class AuthenticatedFlightApiTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
 
+    def test_retrieve_flight_seat_map_bitmap(self):
+        flight, _ = sample_flights()
+        Flight.update_seat_inventory({flight.pk: [(1, 1), (2, 3)]})
+
+        response = self.client.get(detail_url(flight.pk), {"seat_map": "bitmap"})
+        seat_map = response.data["seat_map"]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("taken_places", response.data)
+        self.assertEqual(seat_map["rows"], 10)
+        self.assertEqual(seat_map["seats_in_row"], 8)
+        self.assertEqual(base64.b64decode(seat_map["bitmap"]), b"\x01\x04" + bytes(8))
+
+    def test_retrieve_flight_etag_changes_with_seats(self):
+        flight, _ = sample_flights()
+        etag = self.client.get(detail_url(flight.pk))["ETag"]
+
+        response1 = self.client.get(
+            detail_url(flight.pk), HTTP_IF_NONE_MATCH=etag
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Flight.update_seat_inventory({flight.pk: [(1, 1)]})
+        response2 = self.client.get(
+            detail_url(flight.pk), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response1.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response2.status_code, status.HTTP_200_OK)
+        self.assertEqual(response2.data["taken_places"], [{"row": 1, "seat": 1}])
+
+    def test_search_connecting_itinerary(self):
+        airports, day, first, second = sample_connection()
+
+        response = self.client.get(SEARCH_URL, {
+            "source": airports[0].pk,
+            "destination_city": "Other City",
+            "date": day.isoformat(),
+        })
+        itinerary = response.data[0]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(itinerary["stops"], 1)
+        self.assertEqual(
+            [leg["id"] for leg in itinerary["legs"]], [first.pk, second.pk]
+        )
+
+    def test_search_respects_min_connection(self):
+        airports, day, _, _ = sample_connection()
+
+        response = self.client.get(SEARCH_URL, {
+            "source": airports[0].pk,
+            "destination": airports[2].pk,
+            "date": day.isoformat(),
+            "min_connection": 120,
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_search_requires_destination(self):
+        airports, day, _, _ = sample_connection()
+
+        response = self.client.get(SEARCH_URL, {
+            "source": airports[0].pk,
+            "date": day.isoformat(),
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_sees_flights_committed_by_other_processes(self):
+        cache.clear()
+        index = FlightIndex()
+        day = timezone.localdate() + datetime.timedelta(days=1)
+        self.assertEqual(index.search({1}, {3}, day), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            airports, day, first, second = sample_connection()
+        itineraries = index.search({airports[0].pk}, {airports[2].pk}, day)
+
+        self.assertEqual(
+            [[leg.flight_id for leg in legs] for legs in itineraries],
+            [[first.pk, second.pk]],
+        )
+
+    def test_flight_index_keeps_most_recent_days(self):
+        index = FlightIndex(max_days=2)
+        today = timezone.localdate()
+        days = [today + datetime.timedelta(days=offset) for offset in range(3)]
+
+        for day in [days[0], days[1], days[0], days[2]]:
+            index._get_day(day)
+
+        self.assertEqual(list(index._days), [days[0], days[2]])
+
     def test_create_flight_forbidden(self):
         flight, _ = sample_flights()
         payload = {
@@ -192,6 +389,103 @@ class AdminFlightApiTests(TestCase):
         self.assertEqual(payload["crews"], [crew.pk for crew in flight.crews.all()])
         
 
+    def bulk_payload(self, count):
+        flight, _ = sample_flights()
+        crew = Crew.objects.create(first_name="Test", last_name="Crew")
+        departure = datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc)
+        return [
+            {
+                "route": flight.route.pk,
+                "airplane": flight.airplane.pk,
+                "departure_time": departure + datetime.timedelta(days=index),
+                "arrival_time": departure + datetime.timedelta(days=index, hours=2),
+                "crews": [crew.pk],
+            }
+            for index in range(count)
+        ]
+
+    def test_bulk_create_flights(self):
+        payload = self.bulk_payload(10)
+
+        # Routes, airplanes, crews, the unique check, a savepoint around
+        # the flight and crew inserts, and the crews of the response.
+        with self.assertNumQueries(9):
+            response = self.client.post(FLIGHT_URL, payload, format="json")
+        flights = Flight.objects.filter(
+            departure_time__year=2030
+        ).order_by("departure_time")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [flight["id"] for flight in response.data],
+            [flight.pk for flight in flights],
+        )
+        self.assertEqual(
+            [
+                (
+                    flight.route_id,
+                    flight.airplane_id,
+                    flight.departure_time,
+                    flight.arrival_time,
+                    [crew.pk for crew in flight.crews.all()],
+                )
+                for flight in flights
+            ],
+            [
+                (
+                    item["route"],
+                    item["airplane"],
+                    item["departure_time"],
+                    item["arrival_time"],
+                    item["crews"],
+                )
+                for item in payload
+            ],
+        )
+        self.assertEqual(
+            Flight.crews.through.objects.filter(flight__in=flights).count(),
+            10,
+        )
+
+    def test_bulk_create_flights_invalidates_flight_index(self):
+        payload = self.bulk_payload(2)
+        version = get_version(FlightIndex.version_key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(FLIGHT_URL, payload, format="json")
+
+        self.assertNotEqual(get_version(FlightIndex.version_key), version)
+
+    def test_bulk_create_flights_all_or_nothing(self):
+        payload = self.bulk_payload(3)
+        payload[2]["departure_time"] = payload[0]["departure_time"]
+        payload[2]["arrival_time"] = payload[0]["arrival_time"]
+        payload[1]["airplane"] = 0
+
+        response = self.client.post(FLIGHT_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("airplane", response.data[1])
+        self.assertEqual(response.data[2]["non_field_errors"][0].code, "unique")
+        self.assertFalse(Flight.objects.filter(departure_time__year=2030).exists())
+
+    def test_bulk_create_flights_partial(self):
+        payload = self.bulk_payload(3)
+        self.client.post(FLIGHT_URL, payload[:1], format="json")
+        payload[1]["route"] = 0
+
+        response = self.client.post(
+            f"{FLIGHT_URL}?partial=true", payload, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 1)
+        self.assertEqual(
+            [error["index"] for error in response.data["errors"]], [0, 1]
+        )
+        self.assertEqual(Flight.objects.filter(departure_time__year=2030).count(), 2)
+
     def test_update_flight(self):
         flight, update_data = sample_flights()
         airplane = Airplane.objects.create(
@@ -224,6 +518,51 @@ class AdminFlightApiTests(TestCase):
 
         response = self.client.patch(detail_url(flight.pk), payload)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_change_flight_airplane_leaving_out_sold_seats(self):
+        flight, _ = sample_flights()
+        old_airplane = flight.airplane
+        Ticket.objects.create(
+            row=9, seat=2, flight=flight,
+            order=Order.objects.create(user=self.user),
+        )
+        airplane = Airplane.objects.create(
+            name="Small Test Airplane",
+            rows=8,
+            seats_in_row=8,
+            airplane_type=old_airplane.airplane_type,
+        )
+
+        response = self.client.patch(
+            detail_url(flight.pk), {"airplane": airplane.pk}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("airplane", response.data)
+        flight.refresh_from_db()
+        self.assertEqual(flight.airplane, old_airplane)
+
+    def test_change_flight_airplane_fitting_sold_seats(self):
+        flight, _ = sample_flights()
+        Ticket.objects.create(
+            row=8, seat=2, flight=flight,
+            order=Order.objects.create(user=self.user),
+        )
+        airplane = Airplane.objects.create(
+            name="Small Test Airplane",
+            rows=8,
+            seats_in_row=4,
+            airplane_type=flight.airplane.airplane_type,
+        )
+
+        response = self.client.patch(
+            detail_url(flight.pk), {"airplane": airplane.pk}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        flight.refresh_from_db()
+        self.assertEqual(flight.seats_available, 31)
+        self.assertEqual(list(flight.get_seat_map().taken_places()), [(8, 2)])
     
     def test_delete_flight(self):
         flight, _ = sample_flights()
@@ -231,3 +570,109 @@ class AdminFlightApiTests(TestCase):
         response = self.client.delete(detail_url(flight.pk))
 
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class FlightScheduleTests(TestCase):
+    def setUp(self):
+        flight, _ = sample_flights()
+        self.crew = Crew.objects.create(first_name="John", last_name="Doe")
+        self.schedule = FlightSchedule.objects.create(
+            route=flight.route,
+            airplane=flight.airplane,
+            days_of_week=1 | 4,
+            departure_time=datetime.time(23, 30),
+            time_zone="Europe/Kyiv",
+            duration=datetime.timedelta(hours=2),
+            valid_from=datetime.date(2030, 3, 1),
+            valid_until=datetime.date(2030, 12, 31),
+        )
+        self.schedule.crews.add(self.crew)
+
+    def scheduled_flights(self):
+        return Flight.objects.filter(
+            departure_time__year=2030
+        ).order_by("departure_time")
+
+    def test_expand_schedules_within_horizon(self):
+        created = expand_schedules(
+            horizon=datetime.timedelta(days=13),
+            today=datetime.date(2030, 3, 4),
+        )
+        flights = self.scheduled_flights()
+
+        # Mondays and Wednesdays from March 4 to 17, 2030, at 21:30 UTC.
+        self.assertEqual(created, 4)
+        self.assertEqual(
+            [flight.departure_time.day for flight in flights], [4, 6, 11, 13]
+        )
+        self.assertEqual(flights[0].departure_time.hour, 21)
+        self.assertEqual(
+            flights[0].arrival_time - flights[0].departure_time,
+            datetime.timedelta(hours=2),
+        )
+        self.assertEqual(list(flights[0].crews.all()), [self.crew])
+
+    def test_expand_schedules_again_skips_existing_flights(self):
+        expand_schedules(
+            horizon=datetime.timedelta(days=13),
+            today=datetime.date(2030, 3, 4),
+        )
+        FlightSchedule.objects.update(expanded_until=None)
+        created = expand_schedules(
+            horizon=datetime.timedelta(days=14),
+            today=datetime.date(2030, 3, 4),
+        )
+
+        self.assertEqual(created, 1)
+        self.assertEqual(self.scheduled_flights().count(), 5)
+        self.assertEqual(
+            FlightSchedule.objects.get().expanded_until,
+            datetime.date(2030, 3, 18),
+        )
+
+    def test_insert_flights_counts_only_created_rows(self):
+        expand_schedules(
+            horizon=datetime.timedelta(days=6),
+            today=datetime.date(2030, 3, 4),
+        )
+        flights = self.schedule.flights(
+            datetime.date(2030, 3, 4), datetime.date(2030, 3, 17)
+        )
+
+        created = insert_flights(
+            [(flight, [self.crew.pk]) for flight in flights + flights]
+        )
+
+        self.assertEqual(created, 2)
+        self.assertEqual(self.scheduled_flights().count(), 4)
+        for flight in self.scheduled_flights():
+            self.assertEqual(list(flight.crews.all()), [self.crew])
+
+    def test_admin_change_replaces_unbooked_flights(self):
+        expand_schedules(
+            horizon=datetime.timedelta(days=13),
+            today=datetime.date(2030, 3, 4),
+        )
+        booked = self.scheduled_flights().first()
+        order = Order.objects.create(
+            user=get_user_model().objects.create_user(
+                "test@test.com", "testpass"
+            )
+        )
+        Ticket.objects.create(row=1, seat=1, flight=booked, order=order)
+        self.schedule.refresh_from_db()
+        self.schedule.departure_time = datetime.time(8, 0)
+
+        FlightScheduleAdmin(FlightSchedule, admin.site).save_model(
+            None, self.schedule, None, change=True
+        )
+
+        self.assertEqual(list(self.scheduled_flights()), [booked])
+        self.assertIsNone(FlightSchedule.objects.get().expanded_until)
+        self.assertEqual(
+            expand_schedules(
+                horizon=datetime.timedelta(days=13),
+                today=datetime.date(2030, 3, 4),
+            ),
+            4,
+        )
@@ -0,0 +1,111 @@
+import os
+import tempfile
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from airport.models import Country, City, Airport, Route, Flight, AirplaneType, Airplane, Crew
+
+
+def sample_flight():
+    city = City.objects.create(
+        name="Test City",
+        country=Country.objects.create(
+            name="Test Country"
+        )
+    )
+    airport1 = Airport.objects.create(
+        name="Test Airport 1",
+        closest_big_city=city,
+    )
+    airport2 = Airport.objects.create(
+        name="Test Airport 2",
+        closest_big_city=city,
+    )
+    route = Route.objects.create(
+        source=airport1,
+        destination=airport2,
+        distance=100
+    )
+    airplane = Airplane.objects.create(
+        name="Test Airplane",
+        rows=10,
+        seats_in_row=8,
+        airplane_type=AirplaneType.objects.create(
+            name="Test type"
+        )
+    )
+    return Flight.objects.create(
+        route=route,
+        airplane=airplane,
+        departure_time=timezone.now() + timezone.timedelta(days=2),
+        arrival_time=timezone.now(),
+    )
+
+
+class ImportScheduleTests(TestCase):
+    def setUp(self):
+        flight = sample_flight()
+        self.route = flight.route
+        self.airplane = flight.airplane
+        self.crew = Crew.objects.create(first_name="John", last_name="Doe")
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "schedule.csv")
+        with open(self.path, "w") as file:
+            file.write(
+                "source,destination,airplane,departure_time,arrival_time,crews\n"
+                "Test Airport 1,Test Airport 2,Test Airplane,"
+                "2030-01-01T10:00:00,2030-01-01T12:00:00,John Doe\n"
+                "Test Airport 1,Test Airport 2,Test Airplane,"
+                "2030-01-02T10:00:00,2030-01-02T12:00:00,\n"
+            )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def import_schedule(self, *args):
+        call_command(
+            "import_schedule", self.path, *args, stdout=open(os.devnull, "w")
+        )
+
+    def test_import_schedule(self):
+        self.import_schedule("--batch-size", "1")
+        self.import_schedule()
+
+        flights = Flight.objects.filter(
+            departure_time__year=2030
+        ).order_by("departure_time")
+        self.assertEqual(flights.count(), 2)
+        self.assertEqual(flights[0].route, self.route)
+        self.assertEqual(list(flights[0].crews.all()), [self.crew])
+        self.assertEqual(flights[1].crews.count(), 0)
+        self.assertFalse(os.path.exists(f"{self.path}.checkpoint"))
+
+    def test_import_schedule_resumes_from_checkpoint(self):
+        with open(f"{self.path}.checkpoint", "w") as file:
+            file.write(
+                '{"source": {"path": "%s", "size": %d}, "rows": 1}'
+                % (os.path.abspath(self.path), os.path.getsize(self.path))
+            )
+
+        self.import_schedule()
+
+        self.assertEqual(
+            list(
+                Flight.objects.filter(departure_time__year=2030)
+                .values_list("departure_time__day", flat=True)
+            ),
+            [2],
+        )
+
+    def test_import_schedule_rejects_json_that_is_not_an_object(self):
+        path = os.path.join(self.directory.name, "schedule.ndjson")
+        with open(path, "w") as file:
+            file.write('{"source": "Test Airport 1"}\n\n[1, 2]\n')
+
+        with self.assertRaisesMessage(
+            CommandError, "line 3: not a JSON object"
+        ):
+            call_command(
+                "import_schedule", path, stdout=open(os.devnull, "w")
+            )
@@ -1,5 +1,9 @@
 import os
+import csv
+import json
 import datetime
+import tempfile
+from unittest import mock
 from django.utils import timezone
 from django.test import TestCase
 from django.urls import reverse
@@ -7,11 +11,19 @@ from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 
-from airport.models import Country, City, Airport, Route, Flight, Route, AirplaneType, Airplane, Order
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+from airport.models import Country, City, Airport, Route, Flight, Route, AirplaneType, Airplane, Order, Ticket
 from airport.serializers import OrderListSerializer
 
 
 ORDER_URL = reverse("airport:order-list")
+EXPORT_URL = reverse("airport:order-export")
+
+def detail_url(order_id: int) -> str:
+    return reverse("airport:order-detail", args=[order_id])
 
 
 def sample_order(**params):
@@ -84,6 +96,159 @@ class AuthenticatedOrderApiTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(serializer.data, response.data["results"])
 
+    def test_list_orders_query_count(self):
+        flight = sample_flight()
+        for row in range(1, 6):
+            order = sample_order(user=self.user)
+            for seat in range(1, 5):
+                Ticket.objects.create(
+                    row=row, seat=seat, flight=flight, order=order
+                )
+
+        with self.assertNumQueries(3):
+            response = self.client.get(ORDER_URL)
+
+        tickets = response.data["results"][0]["tickets"]
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(tickets), 4)
+        self.assertIn("tickets_available", tickets[0]["flight"])
+
+    def test_create_order_updates_seats_sold(self):
+        flight = sample_flight()
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "flight": flight.pk},
+                {"row": 1, "seat": 2, "flight": flight.pk},
+            ]
+        }
+
+        response = self.client.post(ORDER_URL, payload, format="json")
+        flight.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(flight.seats_sold, 2)
+        self.assertEqual(flight.seats_available, 78)
+        self.assertEqual(
+            list(flight.get_seat_map().taken_places()), [(1, 1), (1, 2)]
+        )
+
+    def test_create_order_inserts_tickets_at_once(self):
+        flight = sample_flight()
+        payload = {
+            "tickets": [
+                {"row": row, "seat": seat, "flight": flight.pk}
+                for row in range(1, 6)
+                for seat in range(1, 9)
+            ]
+        }
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(ORDER_URL, payload, format="json")
+        ticket_inserts = [
+            query for query in context.captured_queries
+            if query["sql"].startswith('INSERT INTO "airport_ticket"')
+        ]
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Ticket.objects.count(), 40)
+        self.assertEqual(len(ticket_inserts), 1)
+
+    def test_create_order_resolves_flights_once(self):
+        flight = sample_flight()
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": seat, "flight": flight.pk}
+                for seat in range(1, 9)
+            ]
+        }
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(ORDER_URL, payload, format="json")
+        flight_selects = [
+            query for query in context.captured_queries
+            if query["sql"].startswith('SELECT "airport_flight"')
+        ]
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(flight_selects), 2)
+
+    def test_create_order_unknown_flight(self):
+        payload = {"tickets": [{"row": 1, "seat": 1, "flight": 999}]}
+
+        response = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_order_taken_seat_conflict(self):
+        flight = sample_flight()
+        Ticket.objects.create(
+            row=1, seat=2, flight=flight, order=sample_order(user=self.user)
+        )
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "flight": flight.pk},
+                {"row": 1, "seat": 2, "flight": flight.pk},
+            ]
+        }
+
+        response = self.client.post(ORDER_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            response.data["seats"],
+            [{"flight": flight.pk, "row": 1, "seat": 2}],
+        )
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_create_order_other_integrity_error(self):
+        flight = sample_flight()
+        payload = {"tickets": [{"row": 1, "seat": 1, "flight": flight.pk}]}
+
+        with mock.patch.object(
+            Ticket,
+            "bulk_book",
+            side_effect=IntegrityError("NOT NULL constraint failed"),
+        ):
+            with self.assertRaises(IntegrityError):
+                self.client.post(ORDER_URL, payload, format="json")
+
+    def test_create_order_same_seat_twice(self):
+        flight = sample_flight()
+        ticket = {"row": 1, "seat": 1, "flight": flight.pk}
+
+        response = self.client.post(
+            ORDER_URL, {"tickets": [ticket, ticket]}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cancel_order_releases_seats(self):
+        flight = sample_flight()
+        order = sample_order(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=flight, order=order)
+        Flight.update_seat_inventory({flight.pk: [(1, 1)]})
+
+        response = self.client.delete(detail_url(order.pk))
+        flight.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Order.objects.filter(pk=order.pk).exists())
+        self.assertEqual(flight.seats_sold, 0)
+        self.assertEqual(list(flight.get_seat_map().taken_places()), [])
+
+    def test_reconcile_seats(self):
+        flight = sample_flight()
+        order = sample_order(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=flight, order=order)
+        Ticket.objects.create(row=1, seat=2, flight=flight, order=order)
+
+        call_command("reconcile_seats", stdout=open(os.devnull, "w"))
+        flight.refresh_from_db()
+
+        self.assertEqual(flight.seats_sold, 2)
+        self.assertTrue(flight.get_seat_map().is_taken(1, 2))
+
     # def test_create_order(self):
     #     flight = sample_flight()
     #     tickets = [
@@ -105,3 +270,65 @@ class AuthenticatedOrderApiTests(TestCase):
     #     response = self.client.post(ORDER_URL, payload)
     #     print(response.__dict__)
     #     self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class TicketExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@test.com",
+            "testpass",
+            is_staff=True,
+        )
+        self.client.force_authenticate(self.user)
+        self.flight = sample_flight()
+        self.order = sample_order(user=self.user)
+        Ticket.objects.create(row=1, seat=1, flight=self.flight, order=self.order)
+        Ticket.objects.create(row=1, seat=2, flight=self.flight, order=self.order)
+
+    def test_export_forbidden_for_non_admin(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("user@test.com", "testpass")
+        )
+
+        response = self.client.get(EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_csv(self):
+        response = self.client.get(EXPORT_URL, HTTP_ACCEPT="text/csv")
+        rows = list(csv.DictReader(
+            b"".join(response.streaming_content).decode().splitlines()
+        ))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]["seat"], "2")
+        self.assertEqual(rows[0]["user_email"], "admin@test.com")
+        self.assertEqual(rows[0]["source"], "Test Airport 1")
+        self.assertEqual(rows[0]["airplane_type"], "Test type")
+
+    def test_export_ndjson_filtered_by_date(self):
+        today = timezone.localdate()
+        response1 = self.client.get(
+            EXPORT_URL, {"export_format": "ndjson", "created_from": today}
+        )
+        response2 = self.client.get(
+            EXPORT_URL,
+            {"export_format": "ndjson", "created_to": today - datetime.timedelta(days=1)},
+        )
+        lines = b"".join(response1.streaming_content).decode().splitlines()
+
+        self.assertEqual(json.loads(lines[0])["order_id"], self.order.pk)
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(b"".join(response2.streaming_content), b"")
+
+    def test_export_tickets_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tickets.ndjson")
+            call_command("export_tickets", "--format", "ndjson", "--output", path)
+            with open(path) as file:
+                tickets = [json.loads(line) for line in file]
+
+        self.assertEqual([ticket["seat"] for ticket in tickets], [1, 2])
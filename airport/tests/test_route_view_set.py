@@ -4,11 +4,14 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 
 from airport.models import Country, City, Airport, Route
+from airport.routing import RouteGraphCache
 
 
 ROUTE_URL = reverse("airport:route-list")
+SHORTEST_PATH_URL = reverse("airport:route-shortest-path")
 
 
 def sample_route(**params):
@@ -86,6 +89,63 @@ class AuthenticatedRouteApiTests(TestCase):
         self.assertEqual(len(response3.data), 1)
         self.assertEqual(len(response4.data), 1)
 
+    def test_shortest_path(self):
+        route1 = sample_route()
+        airport3 = Airport.objects.create(
+            name="Test Airport3",
+            closest_big_city=route1.source.closest_big_city
+        )
+        route2 = Route.objects.create(
+            source=route1.destination, destination=airport3, distance=100
+        )
+        direct = Route.objects.create(
+            source=route1.source, destination=airport3, distance=500
+        )
+
+        response = self.client.get(SHORTEST_PATH_URL, {
+            "source": route1.source.pk, "destination": airport3.pk
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["shortest_distance"]["routes"],
+            [route1.pk, route2.pk],
+        )
+        self.assertEqual(response.data["shortest_distance"]["distance"], 200)
+        self.assertEqual(response.data["fewest_hops"]["routes"], [direct.pk])
+
+    def test_shortest_path_sees_routes_committed_by_other_processes(self):
+        cache.clear()
+        graph = RouteGraphCache()
+        route = sample_route()
+        self.assertIsNone(
+            graph.get().shortest_distance(
+                route.destination.pk, route.source.pk
+            )
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            back = Route.objects.create(
+                source=route.destination, destination=route.source,
+                distance=100,
+            )
+        path = graph.get().shortest_distance(
+            route.destination.pk, route.source.pk
+        )
+
+        self.assertEqual(path["routes"], [back.pk])
+
+    def test_shortest_path_unreachable(self):
+        route = sample_route()
+
+        response = self.client.get(SHORTEST_PATH_URL, {
+            "source": route.destination.pk, "destination": route.source.pk
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["shortest_distance"])
+        self.assertIsNone(response.data["fewest_hops"])
+
     def test_create_route_forbidden(self):
         city1 = City.objects.create(
             name=f"Test City 1",
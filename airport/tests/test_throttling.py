@@ -0,0 +1,79 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from airport.throttling import UserSlidingWindowThrottle
+from airport.views import OrderViewSet
+
+
+ORDER_URL = reverse("airport:order-list")
+
+
+class ThreePerMinuteThrottle(UserSlidingWindowThrottle):
+    rate = "3/minute"
+
+
+class SlidingWindowThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = APIRequestFactory().post(ORDER_URL)
+        self.request.user = get_user_model().objects.create_user(
+            "test@test.com", "testpass"
+        )
+        # The start of a 6 second bucket of the minute window.
+        self.now = 999_999_996.0
+
+    def allow(self, seconds_later=0):
+        throttle = ThreePerMinuteThrottle()
+        throttle.timer = lambda: self.now + seconds_later
+        return throttle.allow_request(self.request, None)
+
+    def test_limits_requests_in_window(self):
+        allowed = [self.allow(seconds) for seconds in (0, 1, 2, 3, 4)]
+
+        self.assertEqual(allowed, [True, True, True, False, False])
+        self.assertFalse(self.allow(59))
+        self.assertTrue(self.allow(66))
+
+    def test_one_increment_per_request(self):
+        self.allow()
+
+        with mock.patch.object(
+            cache, "get_many", wraps=cache.get_many
+        ) as get_many, mock.patch.object(
+            cache, "incr", wraps=cache.incr
+        ) as incr:
+            self.allow(1)
+
+        self.assertEqual(incr.call_count, 1)
+        self.assertEqual(get_many.call_count, 0)
+
+    def test_increment_is_one_pipelined_round_trip_on_redis(self):
+        throttle = ThreePerMinuteThrottle()
+        throttle.cache = RedisCache("redis://localhost:6379", {})
+        client = mock.Mock()
+        pipeline = client.pipeline.return_value
+        pipeline.incrby.return_value = pipeline
+        pipeline.expire.return_value = pipeline
+        pipeline.execute.return_value = [2, True]
+
+        with mock.patch.object(
+            RedisCache, "_cache", mock.Mock(get_client=mock.Mock(return_value=client))
+        ):
+            count = throttle.increment("bucket", 72)
+
+        key = throttle.cache.make_and_validate_key("bucket")
+        self.assertEqual(count, 2)
+        pipeline.incrby.assert_called_once_with(key, 1)
+        pipeline.expire.assert_called_once_with(key, 72)
+        pipeline.execute.assert_called_once_with()
+
+    def test_booking_has_own_scope(self):
+        view = OrderViewSet(action="create")
+        view.get_throttles()
+
+        self.assertEqual(view.throttle_scope, "booking")
@@ -0,0 +1,117 @@
+"""Sliding window throttles on per-bucket counters.
+
+DRF's throttles keep the timestamp of every request in the window in one
+cache entry, read and rewritten on each check. These split the window
+into ``buckets`` counters instead. A check increments the counter of the
+current bucket, one atomic round trip on Redis. Completed buckets no
+longer change, so each process reads them once per bucket and keeps
+them, and the oldest one is weighted by how much of it is still inside
+the window.
+"""
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    ScopedRateThrottle,
+    SimpleRateThrottle,
+    UserRateThrottle,
+)
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    buckets = 10
+    # Completed bucket counts read by this process, per throttle key.
+    max_known_keys = 10000
+    known_counts = {}
+
+    def bucket_key(self, bucket):
+        return f"{self.key}:{bucket}"
+
+    def increment(self, key, timeout, delta=1):
+        """Adds delta to a bucket counter, created with timeout if missing.
+
+        On Redis, INCRBY and EXPIRE go out as one pipelined transaction, a
+        single round trip; Django's own incr() checks EXISTS first. Other
+        backends create the counter with add() and then incr() it, two
+        operations; taking a request back only needs the incr().
+        """
+        if isinstance(self.cache, RedisCache):
+            name = self.cache.make_and_validate_key(key)
+            client = self.cache._cache.get_client(name, write=True)
+            count, _ = (
+                client.pipeline()
+                .incrby(name, delta)
+                .expire(name, int(timeout))
+                .execute()
+            )
+            return count
+
+        if delta > 0:
+            self.cache.add(key, 0, timeout)
+        return self.cache.incr(key, delta)
+
+    def completed_counts(self, first, last):
+        """Counts of buckets first to last, the current one excluded"""
+        known = self.known_counts.get(self.key)
+        counts = {}
+        if known is not None:
+            counts = dict(zip(range(known[0], last), known[1]))
+        missing = [
+            bucket for bucket in range(first, last) if bucket not in counts
+        ]
+        if missing:
+            values = self.cache.get_many(
+                [self.bucket_key(bucket) for bucket in missing]
+            )
+            for bucket in missing:
+                counts[bucket] = values.get(self.bucket_key(bucket), 0)
+
+        if len(self.known_counts) >= self.max_known_keys:
+            self.known_counts.clear()
+        result = tuple(counts[bucket] for bucket in range(first, last))
+        self.known_counts[self.key] = (first, result)
+        return result
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        self.bucket_duration = self.duration / self.buckets
+        current, offset = divmod(self.now, self.bucket_duration)
+        current = int(current)
+        key = self.bucket_key(current)
+        timeout = self.duration + 2 * self.bucket_duration
+        count = self.increment(key, timeout)
+
+        oldest, *others = self.completed_counts(
+            current - self.buckets, current
+        )
+        weight = 1 - offset / self.bucket_duration
+        if count + sum(others) + oldest * weight <= self.num_requests:
+            return True
+
+        # Rejected requests do not use up the allowance.
+        self.increment(key, timeout, delta=-1)
+        return False
+
+    def wait(self):
+        """Time until the next bucket drops out of the window"""
+        return self.bucket_duration - self.now % self.bucket_duration
+
+
+class AnonSlidingWindowThrottle(AnonRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class UserSlidingWindowThrottle(UserRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class ScopedSlidingWindowThrottle(
+    ScopedRateThrottle, SlidingWindowRateThrottle
+):
+    """Limits views by their ``throttle_scope``, e.g. booking or search"""
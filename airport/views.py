@@ -1,13 +1,27 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, mixins, status
-from django.db.models import F, Count
+from django.db.models import (
+    Count,
+    Exists,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination
 
 from airport.models import (
+    Country,
+    City,
     Airport,
     Crew,
     AirplaneType,
@@ -15,6 +29,7 @@ from airport.models import (
     Route,
     Airplane,
     Flight,
+    Ticket,
 )
 from airport.serializers import (
     AirportSerializer,
@@ -27,22 +42,120 @@ from airport.serializers import (
     OrderListSerializer,
     RouteSerializer,
     RouteListSerializer,
+    RoutePathsSerializer,
+    RoutePathSearchSerializer,
     AirplaneSerializer,
     FlightSerializer,
     FlightListSerializer,
     FlightDetailSerializer,
+    FlightSeatMapDetailSerializer,
+    ItinerarySerializer,
+    ItinerarySearchSerializer,
+    TicketExportSerializer,
     AirportImageSerializer,
     AirplaneImageSerializer,
 )
+from airport.cache import CachedListMixin, CachedRetrieveMixin
+from airport.db_router import ReplicaReadMixin
+from airport.exports import EXPORT_FORMATS, ticket_export_rows
+from airport.itineraries import flight_index
 from airport.permissions import IsAdminOrIfAuthenticatedReadOnly
+from airport.routing import route_graph
+from airport.signals import notify_bulk_create
+
+
+def count_subquery(queryset):
+    """Counts rows of a queryset correlated with OuterRef("pk")"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .annotate(group=Value(1))
+            .values("group")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
 
 
-class OrderPagination(PageNumberPagination):
+class OrderPagination(CursorPagination):
     page_size = 5
     max_page_size = 100
+    ordering = ("-created_at", "id")
+
+
+class FlightPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("departure_time", "id")
+
+
+class BulkCreateMixin:
+    """Creates every object of a list payload in one request.
+
+    Nothing is saved unless all items are valid. With ``?partial=true``
+    the valid items are saved and the errors of the rest are returned
+    with their index.
+    """
+
+    bulk_create_max_items = 5000
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["partial_success"] = (
+            self.request.query_params.get("partial") == "true"
+        )
+        return context
+
+    def perform_bulk_create(self, serializer):
+        self.perform_create(serializer)
+        if not serializer.instance:
+            return
+
+        # Bulk inserts send no post_save, so receivers are notified here.
+        model = serializer.child.Meta.model
+        written = {
+            name for attrs in serializer.validated_data for name in attrs
+        }
+        notify_bulk_create(model)
+        for field in model._meta.many_to_many:
+            if field.name in written:
+                notify_bulk_create(field.related_model)
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(
+            data=request.data, many=True, max_length=self.bulk_create_max_items
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_bulk_create(serializer)
+
+        if not serializer.context["partial_success"]:
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        return Response(
+            {
+                "created": serializer.data,
+                "errors": [
+                    {"index": index, "errors": errors}
+                    for index, errors in sorted(serializer.failures.items())
+                ],
+            },
+            status=(
+                status.HTTP_201_CREATED
+                if serializer.instance
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
 
 
 class AirportViewSet(
+    ReplicaReadMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -50,15 +163,16 @@ class AirportViewSet(
 ):
     queryset = (
         Airport.objects
-        .select_related("closest_big_city")
+        .select_related("closest_big_city__country")
         .annotate(
-            routes_count=(
-                Count("destination_routes")
+            routes_count=count_subquery(
+                Route.objects.filter(destination=OuterRef("pk"))
             )
         )
     )
     serializer_class = AirportSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Country, City, Airport, Route)
 
     @staticmethod
     def _params_to_str(qs):
@@ -84,7 +198,7 @@ class AirportViewSet(
         dest_countries = self.request.query_params.get("dest_countries")
         dest_cities = self.request.query_params.get("dest_cities")
 
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if dep_countries:
             dep_countries = self._params_to_str(dep_countries)
@@ -101,16 +215,28 @@ class AirportViewSet(
         if dest_countries:
             dest_countries = self._params_to_str(dest_countries)
             queryset = queryset.filter(
-                destination_routes__destination__closest_big_city__country__name__in=dest_countries
+                Exists(
+                    Route.objects.filter(
+                        source=OuterRef("pk"),
+                        destination__closest_big_city__country__name__in=(
+                            dest_countries
+                        ),
+                    )
+                )
             )
 
         if dest_cities:
             dest_cities = self._params_to_str(dest_cities)
             queryset = queryset.filter(
-                destination_routes__destination__closest_big_city__name__in=dest_cities
+                Exists(
+                    Route.objects.filter(
+                        source=OuterRef("pk"),
+                        destination__closest_big_city__name__in=dest_cities,
+                    )
+                )
             )
 
-        return queryset.distinct()
+        return queryset
 
     @action(
         methods=["POST"],
@@ -170,22 +296,24 @@ class AirportViewSet(
 
 
 class CrewViewSet(
+    ReplicaReadMixin,
+    BulkCreateMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet
 ):
-    queryset = (
-        Crew.objects
-        .prefetch_related("flights")
-        .annotate(
-            flight_count=(
-                Count("flights")
-            )
+    queryset = Crew.objects.annotate(
+        flight_count=count_subquery(
+            Flight.crews.through.objects.filter(crew=OuterRef("pk"))
         )
     )
     serializer_class = CrewSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Crew, Flight)
+    cache_data = False
 
     @staticmethod
     def _params_to_int(qs):
@@ -203,13 +331,22 @@ class CrewViewSet(
         """Retrieve the staff with filters"""
         flight_ids = self.request.query_params.get("flights")
 
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if flight_ids:
             flight_ids = self._params_to_int(flight_ids)
-            queryset = queryset.filter(flights__pk__in=flight_ids)
+            queryset = queryset.filter(
+                Exists(
+                    Flight.crews.through.objects.filter(
+                        crew=OuterRef("pk"), flight_id__in=flight_ids
+                    )
+                )
+            )
 
-        return queryset.distinct()
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related("flights")
+
+        return queryset
 
     @extend_schema(
         parameters=[
@@ -228,6 +365,8 @@ class CrewViewSet(
 
 
 class AirplaneTypeViewSet(
+    ReplicaReadMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet
@@ -235,22 +374,35 @@ class AirplaneTypeViewSet(
     queryset = AirplaneType.objects.all()
     serializer_class = AirplaneTypeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (AirplaneType,)
 
 
 class OrderViewSet(
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
+    mixins.DestroyModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = Order.objects.prefetch_related(
-        "tickets__flight__route", "tickets__flight__airplane"
-    )
+    queryset = Order.objects.all()
     serializer_class = OrderSerializer
     pagination_class = OrderPagination
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+
+        if self.action == "list":
+            # Tickets and their flights are loaded once per page, flights
+            # with everything FlightListSerializer reads from them.
+            queryset = queryset.prefetch_related(
+                Prefetch("tickets", queryset=Ticket.objects.order_by("pk")),
+                Prefetch(
+                    "tickets__flight",
+                    queryset=Flight.objects.select_related("airplane"),
+                ),
+            )
+
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -258,30 +410,117 @@ class OrderViewSet(
 
         return OrderSerializer
 
+    def get_throttles(self):
+        if self.action == "create":
+            self.throttle_scope = "booking"
+
+        return super().get_throttles()
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        instance.cancel()
+
+    def perform_content_negotiation(self, request, force=False):
+        # Exports are streamed as they are, whatever renderers accept.
+        return super().perform_content_negotiation(
+            request, force=force or self.action == "export"
+        )
+
+    @extend_schema(
+        parameters=[TicketExportSerializer],
+        responses={
+            (200, "text/csv"): OpenApiTypes.STR,
+            (200, "application/x-ndjson"): OpenApiTypes.STR,
+        },
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="export",
+        permission_classes=[IsAdminUser],
+    )
+    def export(self, request):
+        """Endpoint for streaming tickets of all orders as CSV or NDJSON"""
+        params = TicketExportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        lines, content_type, extension = EXPORT_FORMATS[
+            params["export_format"]
+        ]
+        rows = ticket_export_rows(
+            params.get("created_from"), params.get("created_to")
+        )
+        response = StreamingHttpResponse(
+            lines(rows), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="tickets.{extension}"'
+        )
+        return response
+
 
 class RouteViewSet(
+    ReplicaReadMixin,
+    BulkCreateMixin,
+    CachedListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = Route.objects.all()
+    queryset = Route.objects.select_related(
+        "source__closest_big_city__country",
+        "destination__closest_big_city__country",
+    )
     serializer_class = RouteSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Route, Airport, City, Country)
 
     @staticmethod
     def _params_to_str(qs):
         """Converts a string with names to a list"""
         return [string for string in qs.split(",")]
 
+    def get_throttles(self):
+        if self.action == "shortest_path":
+            self.throttle_scope = "search"
+
+        return super().get_throttles()
+
     def get_serializer_class(self):
         if self.action == "list":
             return RouteListSerializer
 
+        if self.action == "shortest_path":
+            return RoutePathsSerializer
+
         return RouteSerializer
 
+    @extend_schema(
+        parameters=[RoutePathSearchSerializer],
+        responses=RoutePathsSerializer,
+    )
+    @action(methods=["GET"], detail=False, url_path="shortest-path")
+    def shortest_path(self, request):
+        """Endpoint for finding the shortest and fewest-hop paths"""
+        params = RoutePathSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        source = params.validated_data["source"]
+        destination = params.validated_data["destination"]
+
+        graph = route_graph.get()
+        serializer = self.get_serializer(
+            {
+                "shortest_distance": graph.shortest_distance(
+                    source, destination
+                ),
+                "fewest_hops": graph.fewest_hops(source, destination),
+            }
+        )
+        return Response(serializer.data)
+
     def get_queryset(self):
         """Retrieve the routes with filters"""
         dep_countries = self.request.query_params.get("dep_countries")
@@ -289,7 +528,7 @@ class RouteViewSet(
         dest_countries = self.request.query_params.get("dest_countries")
         dest_cities = self.request.query_params.get("dest_cities")
 
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
         if dep_countries:
             dep_countries = self._params_to_str(dep_countries)
@@ -315,7 +554,9 @@ class RouteViewSet(
                 destination__closest_big_city__name__in=dest_cities
             )
 
-        return queryset.distinct()
+        # Every filter follows a forward foreign key, so rows can not be
+        # duplicated and no DISTINCT is needed.
+        return queryset
 
     @extend_schema(
         parameters=[
@@ -358,6 +599,8 @@ class RouteViewSet(
 
 
 class AirplaneViewSet(
+    ReplicaReadMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
@@ -365,6 +608,7 @@ class AirplaneViewSet(
     queryset = Airplane.objects.select_related("airplane_type")
     serializer_class = AirplaneSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Airplane,)
 
     def get_serializer_class(self):
         if self.action == "upload_image":
@@ -390,45 +634,146 @@ class AirplaneViewSet(
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class FlightViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Flight.objects.all()
-        .select_related("route", "airplane")
-        .annotate(
-            tickets_available=(
-                F("airplane__rows") * F("airplane__seats_in_row")
-                - Count("tickets")
-            )
-        )
-    )
+class FlightViewSet(
+    ReplicaReadMixin,
+    BulkCreateMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Flight.objects.all().select_related("route", "airplane")
     serializer_class = FlightSerializer
+    pagination_class = FlightPagination
+    search_results_limit = 50
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    # Seat sales change flights all the time, so only conditional
+    # requests are answered from the versions.
+    cache_models = (Flight, Route, Airplane, AirplaneType)
+    cache_data = False
+
+    @staticmethod
+    def _day_start(param, value):
+        """Converts a YYYY-MM-DD string to the start of that day"""
+        try:
+            day = datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            raise ValidationError(
+                {param: "Date has wrong format. Use YYYY-MM-DD."}
+            )
+
+        return timezone.make_aware(day)
+
+    @staticmethod
+    def _id(param, value):
+        """Converts an id query parameter to an int"""
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({param: "A valid integer is required."})
 
     def get_queryset(self):
         """Retrieve the flights with filters"""
         date = self.request.query_params.get("date")
+        date_from = self.request.query_params.get("date_from")
+        date_to = self.request.query_params.get("date_to")
         route = self.request.query_params.get("route")
 
-        queryset = self.queryset
+        queryset = super().get_queryset()
 
+        # Dates become half-open [start, end) ranges on departure_time
+        # instead of a date cast, so the (route, departure_time) index
+        # can serve them.
         if date:
-            date = datetime.strptime(date, "%Y-%m-%d").date()
-            queryset = queryset.filter(departure_time__date=date)
+            start = self._day_start("date", date)
+            queryset = queryset.filter(
+                departure_time__gte=start,
+                departure_time__lt=start + timedelta(days=1),
+            )
+
+        if date_from:
+            queryset = queryset.filter(
+                departure_time__gte=self._day_start("date_from", date_from)
+            )
+
+        if date_to:
+            queryset = queryset.filter(
+                departure_time__lt=(
+                    self._day_start("date_to", date_to) + timedelta(days=1)
+                )
+            )
 
         if route:
-            queryset = queryset.filter(route__id=int(route))
+            queryset = queryset.filter(route_id=self._id("route", route))
 
         return queryset
 
+    def get_throttles(self):
+        if self.action in ("list", "retrieve", "search"):
+            self.throttle_scope = "search"
+
+        return super().get_throttles()
+
     def get_serializer_class(self):
         if self.action == "list":
             return FlightListSerializer
 
         if self.action == "retrieve":
+            if self.request.query_params.get("seat_map") == "bitmap":
+                return FlightSeatMapDetailSerializer
+
             return FlightDetailSerializer
 
+        if self.action == "search":
+            return ItinerarySerializer
+
         return FlightSerializer
 
+    @extend_schema(
+        parameters=[ItinerarySearchSerializer],
+        responses=ItinerarySerializer(many=True),
+    )
+    @action(methods=["GET"], detail=False, url_path="search")
+    def search(self, request):
+        """Endpoint for finding direct and connecting itineraries"""
+        params = ItinerarySearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params = params.validated_data
+
+        airports = {}
+        for point in ("source", "destination"):
+            if point in params:
+                airports[point] = {params[point]}
+            else:
+                airports[point] = flight_index.airports_in_city(
+                    params[f"{point}_city"]
+                )
+
+        itineraries = flight_index.search(
+            airports["source"],
+            airports["destination"],
+            params["date"],
+            max_stops=params["max_stops"],
+            min_connection_time=timedelta(minutes=params["min_connection"]),
+        )[:self.search_results_limit]
+
+        flights = Flight.objects.select_related(
+            "airplane", "route__source", "route__destination"
+        ).in_bulk({leg.flight_id for legs in itineraries for leg in legs})
+        serializer = self.get_serializer(
+            [
+                {
+                    "departure_time": legs[0].departure,
+                    "arrival_time": legs[-1].arrival,
+                    "stops": len(legs) - 1,
+                    "legs": [flights[leg.flight_id] for leg in legs],
+                }
+                for legs in itineraries
+                if all(leg.flight_id in flights for leg in legs)
+            ],
+            many=True,
+        )
+        return Response(serializer.data)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -437,6 +782,18 @@ class FlightViewSet(viewsets.ModelViewSet):
                 description="Filter flights by departure date.",
                 required=False,
             ),
+            OpenApiParameter(
+                "date_from",
+                type=str,
+                description="Filter flights departing on or after the date.",
+                required=False,
+            ),
+            OpenApiParameter(
+                "date_to",
+                type=str,
+                description="Filter flights departing on or before the date.",
+                required=False,
+            ),
             OpenApiParameter(
                 "route",
                 type=int,
@@ -447,3 +804,20 @@ class FlightViewSet(viewsets.ModelViewSet):
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "seat_map",
+                type=str,
+                enum=["bitmap"],
+                description=(
+                    "Return taken seats as a base64 encoded bitmap"
+                    " (one bit per seat, row by row) instead of a list."
+                ),
+                required=False,
+            ),
+        ]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
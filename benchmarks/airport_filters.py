@@ -0,0 +1,116 @@
+"""Join + DISTINCT versus EXISTS airport filters on a synthetic network.
+
+Usage: python -m benchmarks.airport_filters [airports] [routes_per_airport]
+
+The network is created inside a transaction that is rolled back at the
+end. On PostgreSQL the EXPLAIN ANALYZE output of both plans is printed too.
+"""
+import random
+import sys
+
+from benchmarks.utils import report, setup_django, timed
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_network(airports, routes_per_airport, seed=42):
+    from airport.models import Airport, City, Country, Route
+
+    rng = random.Random(seed)
+    countries = Country.objects.bulk_create(
+        Country(name=f"Benchmark Country {index}") for index in range(50)
+    )
+    cities = City.objects.bulk_create(
+        City(name=f"Benchmark City {index}", country=rng.choice(countries))
+        for index in range(airports // 4)
+    )
+    airport_objects = Airport.objects.bulk_create(
+        Airport(
+            name=f"Benchmark Airport {index}",
+            closest_big_city=rng.choice(cities),
+        )
+        for index in range(airports)
+    )
+    Route.objects.bulk_create(
+        (
+            Route(source=source, destination=destination, distance=500)
+            for source in airport_objects
+            for destination in rng.sample(airport_objects, routes_per_airport)
+            if source != destination
+        ),
+        batch_size=5000,
+    )
+    return [country.name for country in rng.sample(countries, 5)]
+
+
+def join_distinct_queryset(countries):
+    """The filter used before: joins every route, then DISTINCT"""
+    from django.db.models import Count
+
+    from airport.models import Airport
+
+    return (
+        Airport.objects.select_related("closest_big_city__country")
+        .annotate(routes_count=Count("destination_routes"))
+        .filter(
+            source_routes__destination__closest_big_city__country__name__in=(
+                countries
+            )
+        )
+        .distinct()
+    )
+
+
+def exists_queryset(countries):
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+
+    from airport.views import AirportViewSet
+
+    view = AirportViewSet(action="list")
+    view.request = Request(
+        RequestFactory().get("/", {"dest_countries": ",".join(countries)})
+    )
+    return view.get_queryset()
+
+
+def main(airports=5000, routes_per_airport=20, repeat=10):
+    setup_django()
+    from django.db import connection, transaction
+
+    try:
+        with transaction.atomic():
+            countries, elapsed = timed(
+                create_network, airports, routes_per_airport
+            )
+            print(
+                f"Created {airports} airports with {routes_per_airport} "
+                f"routes each in {elapsed:.1f} s"
+            )
+
+            for title, build in (
+                ("JOIN + DISTINCT", join_distinct_queryset),
+                ("EXISTS", exists_queryset),
+            ):
+                queryset = build(countries)
+                rows = len(queryset.all())
+                report(
+                    f"{title} ({rows} airports)",
+                    [timed(len, queryset.all())[1] for _ in range(repeat)],
+                )
+
+                if connection.vendor == "postgresql":
+                    sql, params = queryset.query.sql_with_params()
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN ANALYZE {sql}", params)
+                        print("\n".join(row[0] for row in cursor.fetchall()))
+
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,101 @@
+"""Query plans of flight date filters on a large flight table (PostgreSQL).
+
+Usage: python -m benchmarks.flight_filters [flights]
+
+Flights are generated inside a transaction that is rolled back at the end,
+so the benchmark can be pointed at a development database.
+"""
+import sys
+from datetime import timedelta
+
+from benchmarks.utils import setup_django
+
+
+class Rollback(Exception):
+    pass
+
+
+def explain(cursor, queryset):
+    sql, params = queryset.query.sql_with_params()
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+    return "\n".join(row[0] for row in cursor.fetchall())
+
+
+def main(flights=1_000_000):
+    setup_django()
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from airport.models import Airplane, Airport, City, Country, Flight, Route
+
+    if connection.vendor != "postgresql":
+        sys.exit("This benchmark needs the PostgreSQL database.")
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            city = City.objects.create(
+                name="Benchmark City",
+                country=Country.objects.create(name="Benchmark Country"),
+            )
+            airports = [
+                Airport.objects.create(
+                    name=f"Benchmark Airport {index}", closest_big_city=city
+                )
+                for index in range(10)
+            ]
+            routes = [
+                Route.objects.create(
+                    source=source, destination=destination, distance=500
+                )
+                for source in airports
+                for destination in airports
+                if source != destination
+            ]
+            airplane = Airplane.objects.create(
+                name="Benchmark Airplane", rows=30, seats_in_row=6
+            )
+            start = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+            # One departure per route every few minutes, spread over years.
+            cursor.execute(
+                f"""
+                INSERT INTO {Flight._meta.db_table}
+                    (route_id, airplane_id, departure_time, arrival_time,
+                     seats_sold, seat_map)
+                SELECT
+                    %s + n %% %s, %s,
+                    %s + n * interval '5 minutes',
+                    %s + n * interval '5 minutes' + interval '2 hours',
+                    0, ''::bytea
+                FROM generate_series(0, %s - 1) AS n
+                """,
+                [
+                    routes[0].pk, len(routes), airplane.pk,
+                    start, start, flights,
+                ],
+            )
+            cursor.execute(f"ANALYZE {Flight._meta.db_table}")
+
+            day = timezone.localdate(start) + timedelta(days=365)
+            day_start = start.replace(hour=0) + timedelta(days=365)
+            route = routes[len(routes) // 2]
+            plans = {
+                "departure_time__date (old)": Flight.objects.filter(
+                    route=route, departure_time__date=day
+                ),
+                "half-open departure_time range": Flight.objects.filter(
+                    route=route,
+                    departure_time__gte=day_start,
+                    departure_time__lt=day_start + timedelta(days=1),
+                ),
+            }
+            for title, queryset in plans.items():
+                print(f"=== {title}\n{explain(cursor, queryset)}\n")
+
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,122 @@
+"""Requests per second and latency of running servers under load.
+
+Usage: python -m benchmarks.http_load TOKEN URL [URL ...]
+           [--concurrency 50] [--requests 2000]
+
+Start the project under the servers to compare, e.g.
+    gunicorn config.wsgi:application -w 4 -b :8001
+    python manage.py runserver 8002
+and load the same endpoint of each, e.g.
+``http://localhost:8001/api/airport/flights/`` against
+``http://localhost:8002/api/airport/flights/``. TOKEN is a JWT
+access token; raise the "user" throttle rate for the run, or most
+answers will be 429. Requests go over keep-alive connections opened with
+asyncio streams, so only the standard library is needed.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from benchmarks.utils import report
+
+
+async def read_response(reader):
+    """Reads one response, returns (status, connection closed)"""
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    chunked = close = False
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding":
+            chunked = "chunked" in value
+        elif name == "connection":
+            close = value == "close"
+
+    if chunked:
+        while size := int((await reader.readline()).split(b";")[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.readexactly(length)
+    return status, close
+
+
+async def client(url, token, remaining, timings, statuses):
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    request = (
+        f"GET {target} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        f"Authorization: Bearer {token}\r\n"
+        "Accept: application/json\r\n"
+        "\r\n"
+    ).encode()
+
+    reader = writer = None
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        if writer is None:
+            reader, writer = await asyncio.open_connection(
+                parts.hostname, parts.port or 80
+            )
+        start = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+        status, close = await read_response(reader)
+        timings.append(time.perf_counter() - start)
+        statuses[status] += 1
+        if close:
+            writer.close()
+            writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+async def load(url, token, concurrency, requests):
+    """Returns request timings, status counts and the wall time"""
+    timings = []
+    statuses = Counter()
+    remaining = [requests]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client(url, token, remaining, timings, statuses)
+            for _ in range(concurrency)
+        )
+    )
+    return timings, statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("token")
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    for url in args.urls:
+        # Warm up connections, caches and lazily imported code first.
+        asyncio.run(load(url, args.token, args.concurrency, args.concurrency))
+        timings, statuses, elapsed = asyncio.run(
+            load(url, args.token, args.concurrency, args.requests)
+        )
+        print(url)
+        report(f"  concurrency {args.concurrency}", timings)
+        print(
+            f"  {len(timings) / elapsed:.0f} requests/s, status codes "
+            + ", ".join(
+                f"{status}: {count}"
+                for status, count in sorted(statuses.items())
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
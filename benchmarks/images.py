@@ -0,0 +1,61 @@
+"""Cost and size of the image variants against the originals.
+
+Usage: python -m benchmarks.images [width] [height] [repeat]
+
+A synthetic photo is rendered into every variant of airport.images. The
+render times are what an upload request would spend if variants were
+made inline instead of in the worker pool; the sizes are what a list
+page downloads per image with the small variant instead of the original.
+"""
+import random
+import sys
+from io import BytesIO
+
+from benchmarks.utils import report, setup_django, timed
+
+
+def synthetic_photo(width, height):
+    from PIL import Image, ImageFilter
+
+    rng = random.Random(42)
+    image = Image.effect_noise((width // 8, height // 8), 64).convert("RGB")
+    image = image.resize((width, height), Image.Resampling.BICUBIC)
+    for _ in range(40):
+        left, top = rng.randrange(width), rng.randrange(height)
+        image.paste(
+            tuple(rng.randrange(256) for _ in range(3)),
+            (left, top, left + width // 6, top + height // 6),
+        )
+    return image.filter(ImageFilter.GaussianBlur(2))
+
+
+def main(width=4000, height=3000, repeat=5):
+    setup_django()
+    from airport.images import IMAGE_VARIANTS, render_variant
+
+    photo = synthetic_photo(width, height)
+    original = BytesIO()
+    photo.save(original, "JPEG", quality=90)
+    print(
+        f"{f'original {width}x{height} JPEG':<40} "
+        f"{len(original.getvalue()) / 1024:9.1f} KiB"
+    )
+
+    total = []
+    for _ in range(repeat):
+        _, elapsed = timed(
+            lambda: [render_variant(photo, name) for name in IMAGE_VARIANTS]
+        )
+        total.append(elapsed)
+    report("all variants, inline per upload", total)
+
+    for name in IMAGE_VARIANTS:
+        timings = []
+        for _ in range(repeat):
+            data, elapsed = timed(render_variant, photo, name)
+            timings.append(elapsed)
+        report(f"  {name} ({len(data) / 1024:.1f} KiB)", timings)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
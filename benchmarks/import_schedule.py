@@ -0,0 +1,152 @@
+"""Schedule import throughput in rows per second.
+
+Usage: python -m benchmarks.import_schedule [flights] [batch_size]
+
+A synthetic schedule is written to a temporary CSV file and imported with
+the code behind ``manage.py import_schedule`` inside a transaction that is
+rolled back at the end. One-by-one ORM saves of a sample are timed too.
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from benchmarks.utils import setup_django, timed
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_network(airports=100, routes=1000, airplanes=50, crews=500):
+    from airport.models import (
+        Airplane,
+        Airport,
+        City,
+        Country,
+        Crew,
+        Route,
+    )
+
+    rng = random.Random(42)
+    country = Country.objects.create(name="Benchmark Country")
+    city = City.objects.create(name="Benchmark City", country=country)
+    airport_objects = Airport.objects.bulk_create(
+        Airport(name=f"Benchmark Airport {index}", closest_big_city=city)
+        for index in range(airports)
+    )
+    pairs = set()
+    while len(pairs) < routes:
+        source, destination = rng.sample(airport_objects, 2)
+        pairs.add((source.name, destination.name))
+    by_name = {airport.name: airport for airport in airport_objects}
+    Route.objects.bulk_create(
+        Route(
+            source=by_name[source],
+            destination=by_name[destination],
+            distance=500,
+        )
+        for source, destination in pairs
+    )
+    Airplane.objects.bulk_create(
+        Airplane(name=f"Benchmark Airplane {index}", rows=30, seats_in_row=6)
+        for index in range(airplanes)
+    )
+    Crew.objects.bulk_create(
+        Crew(first_name="Benchmark", last_name=f"Crew {index}")
+        for index in range(crews)
+    )
+    return sorted(pairs), airplanes, crews
+
+
+def write_schedule(path, flights, pairs, airplanes, crews):
+    rng = random.Random(42)
+    start = datetime(2030, 1, 1)
+    with open(path, "w") as file:
+        file.write(
+            "source,destination,airplane,departure_time,arrival_time,crews\n"
+        )
+        for index in range(flights):
+            source, destination = rng.choice(pairs)
+            departure = start + timedelta(minutes=index)
+            names = ";".join(
+                f"Benchmark Crew {crew}"
+                for crew in rng.sample(range(crews), 3)
+            )
+            file.write(
+                f"{source},{destination},"
+                f"Benchmark Airplane {rng.randrange(airplanes)},"
+                f"{departure.isoformat()},"
+                f"{(departure + timedelta(hours=2)).isoformat()},"
+                f"{names}\n"
+            )
+
+
+def import_file(path, batch_size):
+    from airport.imports import ScheduleImporter, read_schedule
+    from airport.utils import batched
+
+    importer = ScheduleImporter()
+    created = 0
+    for batch in batched(read_schedule(path), batch_size):
+        created += importer.import_batch(
+            [importer.resolve(row) for row in batch]
+        )
+    return created
+
+
+def save_one_by_one(path, count):
+    from itertools import islice
+
+    from airport.imports import ScheduleImporter, read_schedule
+    from airport.models import Flight
+
+    importer = ScheduleImporter()
+    for row in islice(read_schedule(path), count):
+        flight, crew_ids = importer.resolve(row)
+        flight.departure_time -= timedelta(days=3650)
+        flight.arrival_time -= timedelta(days=3650)
+        flight.save()
+        flight.crews.set(crew_ids)
+    return Flight.objects.count()
+
+
+def main(flights=100000, batch_size=5000):
+    setup_django()
+    from django.db import transaction
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "schedule.csv")
+        try:
+            with transaction.atomic():
+                pairs, airplanes, crews = create_network()
+                write_schedule(path, flights, pairs, airplanes, crews)
+
+                sample = min(flights, 2000)
+                _, elapsed = timed(save_one_by_one, path, sample)
+                print(
+                    f"{'save() one by one':<40} "
+                    f"{sample / elapsed:10.0f} rows/s (n={sample})"
+                )
+
+                created, elapsed = timed(import_file, path, batch_size)
+                print(
+                    f"{f'import_schedule (batch {batch_size})':<40} "
+                    f"{flights / elapsed:10.0f} rows/s "
+                    f"(n={flights}, {created} created)"
+                )
+
+                _, elapsed = timed(import_file, path, batch_size)
+                print(
+                    f"{'import_schedule again (all existing)':<40} "
+                    f"{flights / elapsed:10.0f} rows/s (n={flights})"
+                )
+
+                raise Rollback
+        except Rollback:
+            pass
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,76 @@
+"""Queries and time per JWT authentication, plain against cached users.
+
+Usage: python -m benchmarks.jwt_auth [requests] [users]
+
+Requests carrying access tokens of ``users`` users are authenticated
+with simplejwt's JWTAuthentication and with CachedJWTAuthentication,
+inside a transaction that is rolled back at the end.
+"""
+import sys
+
+from benchmarks.utils import report, setup_django, timed
+
+
+class Rollback(Exception):
+    pass
+
+
+def run(authentication, requests):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    with CaptureQueriesContext(connection) as context:
+        for request in requests:
+            _, elapsed = timed(authentication.authenticate, request)
+            timings.append(elapsed)
+
+    report(type(authentication).__name__, timings, unit="us")
+    print(
+        f"{'':<40} "
+        f"{len(context.captured_queries) / len(requests):.3f} queries/request"
+    )
+
+
+def main(requests=5000, users=50):
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.db import transaction
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from user.authentication import CachedJWTAuthentication
+
+    factory = APIRequestFactory()
+    try:
+        with transaction.atomic():
+            tokens = [
+                str(AccessToken.for_user(user))
+                for user in get_user_model().objects.bulk_create(
+                    get_user_model()(email=f"benchmark{index}@example.com")
+                    for index in range(users)
+                )
+            ]
+            batch = [
+                factory.get(
+                    "/api/airport/flights/",
+                    HTTP_AUTHORIZATION=f"Bearer {tokens[index % users]}",
+                )
+                for index in range(requests)
+            ]
+
+            cache.clear()
+            for authentication in (
+                JWTAuthentication(), CachedJWTAuthentication()
+            ):
+                run(authentication, batch)
+
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,81 @@
+"""Shortest-path queries on a synthetic route network.
+
+Usage: python -m benchmarks.routing [airports] [routes] [queries]
+
+Queries are timed in three groups: cold ones from sources whose search
+tree is not cached yet, warm ones repeating those sources, and a mix
+with uniformly random sources, where the tree cache of RouteGraph
+(256 sources) covers only a part of the airports.
+"""
+import random
+import sys
+
+from benchmarks.utils import report, setup_django, timed
+
+
+def synthetic_routes(airports, routes, seed=42):
+    """Hub-and-spoke network: 5% of airports take half of the routes"""
+    rng = random.Random(seed)
+    hubs = range(1, max(airports // 20, 2) + 1)
+    pairs = set()
+
+    while len(pairs) < routes:
+        source = rng.randint(1, airports)
+        if rng.random() < 0.5:
+            destination = rng.choice(hubs)
+        else:
+            destination = rng.randint(1, airports)
+        if source != destination:
+            pairs.add((source, destination))
+            pairs.add((destination, source))
+
+    return [
+        (route_id, source, destination, rng.randint(100, 12000))
+        for route_id, (source, destination) in enumerate(sorted(pairs), 1)
+    ]
+
+
+def main(airports=5000, routes=40000, queries=2000):
+    setup_django()
+    from airport.routing import RouteGraph
+
+    rng = random.Random(7)
+    edges = synthetic_routes(airports, routes)
+    graph, elapsed = timed(RouteGraph, edges)
+    print(
+        f"Graph of {airports} airports and {len(edges)} routes "
+        f"built in {elapsed * 1e3:.1f} ms"
+    )
+
+    sources = rng.sample(range(1, airports + 1), 200)
+    pairs = [
+        (rng.choice(sources), rng.randint(1, airports))
+        for _ in range(queries)
+    ]
+    mixed = [
+        (rng.randint(1, airports), rng.randint(1, airports))
+        for _ in range(queries)
+    ]
+
+    for method, tree in (
+        ("shortest_distance", graph.distance_tree),
+        ("fewest_hops", graph.hops_tree),
+    ):
+        query = getattr(graph, method)
+        cold = [
+            timed(query, source, source % airports + 1)[1]
+            for source in sources
+        ]
+        warm = [timed(query, *pair)[1] for pair in pairs]
+        report(f"{method} cold (tree computed)", cold)
+        report(f"{method} warm (tree cached)", warm, unit="us")
+
+        tree.cache_clear()
+        timings = [timed(query, *pair)[1] for pair in mixed]
+        hits = tree.cache_info().hits
+        report(f"{method} random sources", timings)
+        print(f"{'':<40} {hits / len(mixed):.1%} tree cache hits")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,79 @@
+"""Startup time and per-request latency of the settings profiles.
+
+Usage: python -m benchmarks.runtime_profile [requests]
+
+Each profile is measured in a fresh interpreter with DJANGO_ENV set, as
+a server process would see it: the time to set Django up and answer the
+first request, then the latency of the flight list, which always runs a
+query. The development profile carries the debug toolbar, SQL logging
+and a new database connection per request, the production one none of
+them.
+"""
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.utils import report, setup_django, timed
+
+
+PROFILES = {
+    "development": {"DJANGO_ENV": "development"},
+    "production": {
+        "DJANGO_ENV": "production",
+        "DJANGO_SECRET_KEY": "benchmark-secret-key",
+        "MEDIA_ACCEL_REDIRECT": "/protected-media/",
+    },
+}
+
+
+def measure(requests):
+    start = time.perf_counter()
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from rest_framework.throttling import SimpleRateThrottle
+
+    # Throttling is not what is measured here.
+    SimpleRateThrottle.THROTTLE_RATES = dict.fromkeys(
+        SimpleRateThrottle.THROTTLE_RATES
+    )
+
+    client = APIClient(HTTP_HOST="localhost", REMOTE_ADDR="127.0.0.1")
+    client.force_authenticate(get_user_model()(id=0, email="bench@bench"))
+    url = "/api/airport/flights/?page_size=20"
+    client.get(url)
+    print(
+        f"{'startup and first request':<40} "
+        f"{time.perf_counter() - start:9.3f} s"
+    )
+
+    timings = []
+    for _ in range(requests):
+        response, elapsed = timed(client.get, url)
+        assert response.status_code == 200, response.status_code
+        timings.append(elapsed)
+    report("flight list", timings)
+
+
+def main(requests=500):
+    for profile, environment in PROFILES.items():
+        print(f"[{profile}]", flush=True)
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.runtime_profile",
+                "--measure",
+                str(requests),
+            ],
+            env={**os.environ, **environment},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--measure"]:
+        measure(int(sys.argv[2]))
+    else:
+        main(*(int(arg) for arg in sys.argv[1:]))
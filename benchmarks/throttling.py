@@ -0,0 +1,87 @@
+"""Cost of a throttle check, DRF's history lists against counter buckets.
+
+Usage: python -m benchmarks.throttling [checks] [users] [rate]
+
+Each user makes checks / users requests, spread over a minute of a fake
+clock, against a limit of ``rate`` requests a minute. Time per check and
+cache operations per check, by operation, are reported for both
+throttles on a local memory cache. On a shared backend each operation is
+a round trip, except that on Redis the sliding window add() and incr()
+are replaced by one pipelined INCRBY + EXPIRE.
+"""
+import sys
+from collections import Counter
+from types import SimpleNamespace
+
+from benchmarks.utils import report, setup_django, timed
+
+
+class CountingCache:
+    """Cache proxy counting the operations made through it"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.operations = Counter()
+
+    def __getattr__(self, name):
+        method = getattr(self.cache, name)
+
+        def counted(*args, **kwargs):
+            self.operations[name] += 1
+            return method(*args, **kwargs)
+
+        return counted
+
+
+def run(throttle_class, checks, users, rate):
+    from django.core.cache import caches
+
+    cache = CountingCache(caches["default"])
+    cache.clear()
+    cache.operations.clear()
+
+    class Throttle(throttle_class):
+        pass
+
+    Throttle.rate = rate
+    Throttle.cache = cache
+    requests = [
+        SimpleNamespace(user=SimpleNamespace(is_authenticated=True, pk=pk))
+        for pk in range(users)
+    ]
+
+    timings = []
+    allowed = 0
+    for index in range(checks):
+        throttle = Throttle()
+        now = 1_000_000_000 + 60 * index / checks
+        throttle.timer = lambda: now
+        result, elapsed = timed(
+            throttle.allow_request, requests[index % users], None
+        )
+        timings.append(elapsed)
+        allowed += result
+
+    report(throttle_class.__name__, timings, unit="us")
+    by_name = ", ".join(
+        f"{name} {count / checks:.2f}"
+        for name, count in cache.operations.most_common()
+    )
+    print(
+        f"{'':<40} {sum(cache.operations.values()) / checks:.2f}"
+        f" cache operations/check ({by_name}), {allowed} of {checks} allowed"
+    )
+
+
+def main(checks=100000, users=100, rate="1000/minute"):
+    setup_django()
+    from rest_framework.throttling import UserRateThrottle
+
+    from airport.throttling import UserSlidingWindowThrottle
+
+    for throttle_class in (UserRateThrottle, UserSlidingWindowThrottle):
+        run(throttle_class, int(checks), int(users), rate)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,35 @@
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+def setup_django():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+    import django
+
+    django.setup()
+
+
+def timed(function, *args, **kwargs):
+    """Runs function once and returns (result, elapsed seconds)"""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def report(title, timings, unit="ms"):
+    """Prints mean, p50 and p99 of timings given in seconds"""
+    scale = {"s": 1, "ms": 1e3, "us": 1e6}[unit]
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(
+        f"{title:<40} "
+        f"mean {statistics.mean(timings) * scale:9.3f} {unit}  "
+        f"p50 {timings[len(timings) // 2] * scale:9.3f} {unit}  "
+        f"p99 {p99 * scale:9.3f} {unit}  "
+        f"(n={len(timings)})"
+    )
@@ -11,8 +11,10 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -25,14 +27,26 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = (
-    "django-insecure-v80g2wo(z#4r5yj(%df_j8qsrw++c^%-!y3qw$aq)p3xhh=^=2"
+SECRET_KEY = os.getenv(
+    "DJANGO_SECRET_KEY",
+    "django-insecure-v80g2wo(z#4r5yj(%df_j8qsrw++c^%-!y3qw$aq)p3xhh=^=2",
 )
 
+# Runtime profile, "development" by default. "production" turns off
+# DEBUG (and with it the debug toolbar and in-memory SQL logging) and
+# keeps database connections open between requests.
+DJANGO_ENV = os.getenv("DJANGO_ENV", "development")
+PRODUCTION = DJANGO_ENV == "production"
+
+if PRODUCTION and SECRET_KEY.startswith("django-insecure-"):
+    raise ImproperlyConfigured("Set DJANGO_SECRET_KEY in production.")
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv("DJANGO_DEBUG", "0" if PRODUCTION else "1") == "1"
 
-ALLOWED_HOSTS = ["localhost", "127.0.0.1", "0.0.0.0"]
+ALLOWED_HOSTS = os.getenv(
+    "DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1,0.0.0.0"
+).split(",")
 
 INTERNAL_IPS = [
     "127.0.0.1",
@@ -49,24 +63,30 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
-    "debug_toolbar",
     "drf_spectacular",
     "airport",
     "user",
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append("debug_toolbar")
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "airport.throttling.AnonSlidingWindowThrottle",
+        "airport.throttling.UserSlidingWindowThrottle",
+        "airport.throttling.ScopedSlidingWindowThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "10/minute",
         "user": "30/minute",
+        # Per endpoint scopes, counted apart from the rates above.
+        "booking": "10/minute",
+        "search": "30/minute",
     },
 }
 
@@ -86,15 +106,18 @@ SIMPLE_JWT = {
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "airport.db_router.PrimaryAfterWriteMiddleware",
 ]
 
+if DEBUG:
+    MIDDLEWARE.insert(1, "debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -126,6 +149,59 @@ DATABASES = {
         "USER": os.getenv("POSTGRES_USER"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
+        # Seconds a connection is kept for later requests, 0 closes it at
+        # the end of each request. Kept connections are health checked
+        # before reuse, see airport.signals.
+        "CONN_MAX_AGE": int(
+            os.getenv("DB_CONN_MAX_AGE", "600" if PRODUCTION else "0")
+        ),
+    }
+}
+
+# Read replicas of the primary as comma separated POSTGRES_REPLICA_HOSTS.
+# Without any, reads stay on the primary. Test runs (or DB_TEST_REPLICA=1)
+# add a test mirror instead: a replica alias of the primary itself, so the
+# routing of airport.db_router is exercised. It is not a real replica and
+# opens a second connection to the primary, so development goes without.
+REPLICA_HOSTS = [
+    host for host in os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")
+    if host
+]
+TEST_REPLICA = os.getenv(
+    "DB_TEST_REPLICA", "1" if sys.argv[1:2] == ["test"] else "0"
+) == "1"
+if not REPLICA_HOSTS and TEST_REPLICA and not PRODUCTION:
+    REPLICA_HOSTS = [DATABASES["default"]["HOST"]]
+
+for index, host in enumerate(REPLICA_HOSTS, start=1):
+    DATABASES[f"replica{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["airport.db_router.ReplicaRouter"]
+
+# Seconds the replicas may lag behind. A user's reads stay on the primary
+# for as long after their own writes, and reads of recently changed data
+# too.
+REPLICA_LAG_SECONDS = int(os.getenv("REPLICA_LAG_SECONDS", "5"))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache and
+# redis://redis:6379) in production so all workers see the same entries
+# and throttle counters.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
     }
 }
 
@@ -174,6 +250,19 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = "/vol/web/media"
 
+# Uploads are named by their content hash and served as immutable.
+DEFAULT_FILE_STORAGE = "airport.media.ContentAddressedStorage"
+# Internal nginx location mapped to MEDIA_ROOT, e.g. /protected-media/.
+# When set, media responses hand the file to nginx with X-Accel-Redirect;
+# otherwise Django streams media with DEBUG on only. Required in production.
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT", "")
+
+if PRODUCTION and not MEDIA_ACCEL_REDIRECT:
+    raise ImproperlyConfigured("Set MEDIA_ACCEL_REDIRECT in production.")
+
+# Threads resizing uploaded images into variants, see airport.images.
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -3,10 +3,16 @@
 python manage.py wait_for_db
 
 
-# Perform Django database migrations
-python manage.py makemigrations
+# Apply the migrations shipped with the code
 python manage.py migrate
 
 
+if [ "$DJANGO_ENV" = "production" ]; then
+    # Serve with a process per worker; media goes through nginx
+    exec gunicorn config.wsgi:application \
+        -w "${WEB_CONCURRENCY:-4}" \
+        -b 0.0.0.0:8000
+fi
+
 # Start Django development server
 python manage.py runserver 0.0.0.0:8000
@@ -0,0 +1,48 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+
+USER_KEY = "user:jwt:{}"
+# The only user fields kept in the cache, what permission checks read.
+CACHED_FIELDS = ("id", "is_active", "is_staff")
+
+
+def user_cache_key(user_id):
+    return USER_KEY.format(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that keeps the user of a token in the cache.
+
+    The user is looked up once and CACHED_FIELDS of it are kept until the
+    token expires, so later requests with the token need no query. They
+    get a user with the other fields deferred, loaded from the database
+    if read. Saving or deleting the user drops the entry, see
+    user.signals.
+    """
+
+    def get_user(self, validated_token):
+        key = user_cache_key(validated_token.get(api_settings.USER_ID_CLAIM))
+        fields = cache.get(key)
+        if fields is None:
+            user = super().get_user(validated_token)
+            cache.set(
+                key,
+                {name: getattr(user, name) for name in CACHED_FIELDS},
+                timeout=max(validated_token["exp"] - time.time(), 1),
+            )
+            return user
+
+        if not fields["is_active"]:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+        return get_user_model().from_db(
+            None, list(fields), list(fields.values())
+        )
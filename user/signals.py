@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.authentication import user_cache_key
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def forget_authenticated_user(sender, instance, using=None, **kwargs):
+    """Password, is_active and is_staff changes apply to the next request.
+
+    The entry is dropped once the transaction commits; dropped earlier, a
+    concurrent request could cache the old row again until the token
+    expires.
+    """
+    key = user_cache_key(instance.pk)
+    transaction.on_commit(lambda: cache.delete(key), using=using)
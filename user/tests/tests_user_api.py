@@ -1,9 +1,15 @@
 from django.test import TestCase
+from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.authentication import user_cache_key
 
 
 CREATE_USER_URL = reverse("user:create")
@@ -150,3 +156,71 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.email, payload["email"])
         self.assertTrue(self.user.check_password(payload["password"]))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class JwtUserCacheTests(TestCase):
+    """Test the users of access tokens are cached"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(email="test@test.com", password="testpass")
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def test_user_looked_up_once_per_token(self):
+        """Test only the first request with a token authenticates by query"""
+        # The me url itself reads the user row once per request.
+        with self.assertNumQueries(2):
+            res1 = self.client.get(ME_URL)
+        with self.assertNumQueries(1):
+            res2 = self.client.get(ME_URL)
+
+        self.assertEqual(res1.status_code, status.HTTP_200_OK)
+        self.assertEqual(res2.data, res1.data)
+
+    def test_cache_keeps_only_auth_fields(self):
+        """Test the password hash and profile are not put in the cache"""
+        self.client.get(ME_URL)
+
+        self.assertEqual(
+            cache.get(user_cache_key(self.user.pk)),
+            {"id": self.user.pk, "is_active": True, "is_staff": False},
+        )
+
+    def test_changes_through_me_invalidate_cached_user(self):
+        """Test the next request sees a password changed on the me url"""
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(ME_URL, {"password": "newpassword123"})
+        with self.assertNumQueries(2):
+            self.client.get(ME_URL)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user is rejected on the next request"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_admin_change_forgets_user_on_commit(self):
+        """Test an admin save drops the cached user once it commits"""
+        self.client.get(ME_URL)
+        user_admin = admin.site._registry[get_user_model()]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.user.is_active = False
+                user_admin.save_model(None, self.user, None, change=True)
+                # Until then other requests still see the committed row.
+                self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
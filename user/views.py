@@ -1,7 +1,9 @@
+from django.contrib.auth import get_user_model
 from rest_framework import generics
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from user.authentication import CachedJWTAuthentication
 from user.serializers import UserSerializer
 
 
@@ -11,8 +13,9 @@ class CreateUserView(generics.CreateAPIView):
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, CachedJWTAuthentication)
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
+        # The authenticated user may carry only the cached fields.
+        return get_user_model().objects.get(pk=self.request.user.pk)